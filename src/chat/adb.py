@@ -159,19 +159,28 @@ class AdbHelper:
                 return None
             return False
 
-    def save_photo(self, output_path: str = "temp/photo.jpg") -> bool:
+    def read_photo(self) -> bytes | None:
         """
-        保存最新图片封面到本地
+        读取最新图片封面，直接返回 JPEG 数据，不写入磁盘
         """
         result = self.shell(
             "cat /storage/emulated/0/DCIM/XiaoAi/*.jpg",
-            error_message="保存图片失败",
+            error_message="读取图片失败",
             device="client",
             return_result=True,
         )
         if result and result.stdout:
+            return result.stdout
+        return None
+
+    def save_photo(self, output_path: str = "temp/photo.jpg") -> bool:
+        """
+        保存最新图片封面到本地
+        """
+        data = self.read_photo()
+        if data:
             with open(output_path, "wb") as f:
-                f.write(result.stdout)
+                f.write(data)
             return True
         return False
 
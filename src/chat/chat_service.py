@@ -9,10 +9,19 @@ from enum import Enum, auto
 from time import sleep
 from typing import Any, Optional
 
+import numpy as np
+
 from cube import Cube
+from cube.cache import SolutionCache
+from cube.kociemba import start_warmup
 from cube.typing import Move, Solution
 from utils.core import write_json
-from vision.image import extract_colors
+from vision.cluster import cluster_colors
+from vision.corner import compose_order, compose_state, extract_three_faces
+from vision.image import extract_colors, load_image
+from vision.quality import ImageQualityError, QualityGate
+from vision.service import PredictorService
+from vision.tracker import CubeTracker
 
 from .adb import AdbHelper, AsrMessage
 
@@ -35,6 +44,7 @@ class CubeFaceData:
     chinese_name: str  # 中文名称
     colors: str = ""  # 颜色字符串 (9个字符)
     image_path: str = ""  # 图片路径
+    samples: Any = None  # 9 个色块的 HSV 中值，整体聚类时使用
 
 
 @dataclass
@@ -90,11 +100,47 @@ class ChatService:
         CubeFaceData("back", "后面"),
     ]
 
-    def __init__(self, adb_helper: Optional[AdbHelper] = None, debug: bool = False):
+    # 斜角拍摄时的收集顺序，每张照片识别三个面
+    CORNER_ORDER = [
+        CubeFaceData("corner", "前面、上面和右面"),
+        CubeFaceData(
+            "corner_flipped",
+            "下面、左面和后面（先把魔方向前翻转180度，再把左面转到前面）",
+        ),
+    ]
+
+    def __init__(
+        self,
+        adb_helper: Optional[AdbHelper] = None,
+        debug: bool = False,
+        color_mode: str = "threshold",
+        dump_images: bool = False,
+        capture_mode: str = "faces",
+        predictor: Optional[PredictorService] = None,
+    ):
+        """
+        color_mode: threshold 逐个色块按 HSV 阈值识别；
+                    cluster 收集完 6 个面后把 54 个色块整体聚成 6 种颜色，对光照更稳健
+        dump_images: 是否把拍到的照片保存到 temp 目录，便于排查识别问题
+        capture_mode: faces 每张照片拍一个面，共 6 张；
+                      corner 从角上斜着拍，每张照片识别三个面，共 2 张 (见 vision.corner)
+        predictor: 魔方检测的批量预测服务，同一进程中的多个会话可以共用一个，
+                   并发的检测请求会合并推理
+        """
         self.adb = adb_helper or AdbHelper()
         self.debug = debug
+        self.color_mode = color_mode
+        self.dump_images = dump_images
+        self.capture_mode = capture_mode
+        self.face_order = (
+            self.CORNER_ORDER if capture_mode == "corner" else self.FACE_ORDER
+        )
         self.context = DialogContext()
         self._cube_state: str | None = None
+        self.cache = SolutionCache()
+        self.tracker = CubeTracker()
+        self.gate = QualityGate()
+        self.predictor = predictor or PredictorService()
 
         # 确保 temp 目录存在
         os.makedirs("temp", exist_ok=True)
@@ -106,15 +152,15 @@ class ChatService:
 
     def _get_current_face(self) -> Optional[CubeFaceData]:
         """获取当前需要收集的面"""
-        if self.context.current_face_index < len(self.FACE_ORDER):
-            return self.FACE_ORDER[self.context.current_face_index]
+        if self.context.current_face_index < len(self.face_order):
+            return self.face_order[self.context.current_face_index]
         return None
 
     def _get_next_face(self) -> Optional[CubeFaceData]:
         """获取下一个需要收集的面"""
         next_index = self.context.current_face_index + 1
-        if next_index < len(self.FACE_ORDER):
-            return self.FACE_ORDER[next_index]
+        if next_index < len(self.face_order):
+            return self.face_order[next_index]
         return None
 
     def _is_face_confirmation(self, text: str) -> bool:
@@ -127,6 +173,8 @@ class ChatService:
         self.context.state = DialogState.WAITING_FACE
         self.context.faces = []
         self.context.current_face_index = 0
+        self.tracker.reset()
+        self.gate.reset()
 
         current_face = self._get_current_face()
         self.notify(f"好的主人，让我看下魔方{current_face.chinese_name}是什么颜色。")
@@ -145,14 +193,46 @@ class ChatService:
         # 等待缩略图更新
         sleep(1)
 
-        # 获取图片
-        image_path = f"temp/cube_{current_face.name}.jpg"
-        if not self.adb.save_photo(image_path):
+        # 获取图片，直接在内存中解码
+        photo = self.adb.read_photo()
+        if not photo:
             self.notify("获取图片失败，请重试")
             return
 
-        # 从图片提取颜色
-        colors = extract_colors(image_path)
+        image_path = ""
+        if self.dump_images:
+            image_path = f"temp/cube_{current_face.name}.jpg"
+            with open(image_path, "wb") as f:
+                f.write(photo)
+
+        # 从图片提取颜色，照片不可用或没有找到魔方时重新拍照
+        try:
+            if self.capture_mode == "corner":
+                image = load_image(photo)
+                if image is not None:
+                    self.gate.check(image)
+                result = (
+                    extract_three_faces(image, service=self.predictor)
+                    if image is not None
+                    else None
+                )
+            else:
+                result = extract_colors(
+                    photo,
+                    tracker=self.tracker,
+                    return_samples=True,
+                    gate=self.gate,
+                    service=self.predictor,
+                )
+        except ImageQualityError as e:
+            self.notify(f"{e}，请重新拍一张。")
+            return
+        if result is None:
+            self.notify(
+                f"没有找到魔方，请把魔方{current_face.chinese_name}对准镜头再拍一张。"
+            )
+            return
+        colors, samples = result
 
         # 保存面数据
         face_data = CubeFaceData(
@@ -160,6 +240,7 @@ class ChatService:
             chinese_name=current_face.chinese_name,
             colors=colors,
             image_path=image_path,
+            samples=samples,
         )
         self.context.faces.append(face_data)
         self.context.current_face_index += 1
@@ -175,22 +256,14 @@ class ChatService:
         """开始求解魔方"""
         self.context.state = DialogState.SOLVING
 
-        # 组合魔方状态字符串
-        # 顺序: FRONT(9) + LEFT(9) + RIGHT(9) + UP(9) + DOWN(9) + BACK(9)
-        face_map = {face.name: face.colors for face in self.context.faces}
-
-        cube_state = (
-            self._cube_state
-            if self._cube_state
-            else (
-                face_map.get("front", "X" * 9)
-                + face_map.get("left", "X" * 9)
-                + face_map.get("right", "X" * 9)
-                + face_map.get("up", "X" * 9)
-                + face_map.get("down", "X" * 9)
-                + face_map.get("back", "X" * 9)
+        if self._cube_state is None:
+            metrics = self.predictor.metrics()
+            print(
+                f"📊 魔方检测: {metrics['requests']} 次请求，"
+                f"平均每批 {metrics['avg_batch_size']:.1f} 张，"
+                f"耗时 p50 {metrics['latency_p50']:.0f}ms / p95 {metrics['latency_p95']:.0f}ms"
             )
-        )
+        cube_state = self._cube_state or self._compose_state()
 
         try:
             cube = Cube(cube_state)
@@ -200,7 +273,7 @@ class ChatService:
                 self.context.reset()
                 return
 
-            solution = cube.solve()
+            solution = cube.solve(cache=self.cache)
 
             # 解析操作步骤
             moves = solution.ops.split(" ")
@@ -215,6 +288,49 @@ class ChatService:
             self.notify(f"求解失败: {e}")
             self.context.reset()
 
+    def _compose_state(self) -> str:
+        """
+        组合魔方状态字符串
+        顺序: FRONT(9) + LEFT(9) + RIGHT(9) + UP(9) + DOWN(9) + BACK(9)
+        """
+        if self.capture_mode == "corner":
+            return self._compose_corner_state()
+
+        face_map = {face.name: face.colors for face in self.context.faces}
+        if self.color_mode == "cluster":
+            face_map.update(self._cluster_faces())
+
+        return (
+            face_map.get("front", "X" * 9)
+            + face_map.get("left", "X" * 9)
+            + face_map.get("right", "X" * 9)
+            + face_map.get("up", "X" * 9)
+            + face_map.get("down", "X" * 9)
+            + face_map.get("back", "X" * 9)
+        )
+
+    def _compose_corner_state(self) -> str:
+        """合并两张斜角照片，识别失败的照片对应的色块为 X"""
+        faces = {face.name: face for face in self.context.faces}
+        photos = [faces.get("corner"), faces.get("corner_flipped")]
+        if self.color_mode == "cluster" and all(
+            face and face.samples is not None for face in photos
+        ):
+            samples = np.concatenate([face.samples for face in photos])
+            return cluster_colors(samples[compose_order()])
+        return compose_state(
+            *(face.colors if face and face.colors else "X" * 27 for face in photos)
+        )
+
+    def _cluster_faces(self) -> dict[str, str]:
+        """6 个面都有色块采样时整体聚类，返回各面的颜色字符串"""
+        samples = {face.name: face.samples for face in self.context.faces}
+        order = ["front", "left", "right", "up", "down", "back"]
+        if any(samples.get(name) is None for name in order):
+            return {}
+        colors = cluster_colors(np.concatenate([samples[name] for name in order]))
+        return {name: colors[idx * 9 : idx * 9 + 9] for idx, name in enumerate(order)}
+
     def _handle_next_step(self):
         """处理下一步指令"""
         total = len(self.context.solution_steps)
@@ -309,6 +425,12 @@ class ChatService:
         """启动对话服务"""
         print('魔方助手已启动，请说"解魔方"开始...')
 
+        # 后台预加载 Kociemba 剪枝表，避免首次求解时等待
+        start_warmup()
+
+        # 加载魔方检测模型并预热，启动批量预测服务，避免确认第一个面时等待
+        self.predictor.start()
+
         if self.debug:
             self._cube_state = "WYBRRYGROGGRGBBYYOOBROGWWRBYBBOYOGBWYWGGWGBRWYWROOWRYO"
             self._start_solving()
@@ -49,6 +49,23 @@ def main():
         help="是否为调试模式",
         action="store_true",
     )
+    parser.add_argument(
+        "--colors",
+        help="颜色识别方式：threshold 按 HSV 阈值逐块识别，cluster 6 个面整体聚类",
+        choices=["threshold", "cluster"],
+        default="threshold",
+    )
+    parser.add_argument(
+        "--capture",
+        help="拍摄方式：faces 每张照片一个面，corner 从角上斜着拍，两张照片识别 6 个面",
+        choices=["faces", "corner"],
+        default="faces",
+    )
+    parser.add_argument(
+        "--dump-images",
+        help="是否把拍到的照片保存到 temp 目录",
+        action="store_true",
+    )
 
     args = parser.parse_args()
     
@@ -70,6 +87,9 @@ def main():
     service = ChatService(
         adb_helper=adb,
         debug=args.debug,
+        color_mode=args.colors,
+        dump_images=args.dump_images,
+        capture_mode=args.capture,
     )
 
     service.start()
@@ -2,6 +2,7 @@
 三阶魔方速解（基于CFOP方法）
 """
 
+from .batch import solve_many
 from .cube import Cube
 
-__all__ = ["Cube"]
+__all__ = ["Cube", "solve_many"]
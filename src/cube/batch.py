@@ -0,0 +1,159 @@
+"""
+批量求解
+"""
+
+import multiprocessing
+import os
+import time
+from multiprocessing.connection import wait
+from typing import Iterable, Iterator
+
+from .cube import Cube
+from .kociemba import warmup
+from .typing import Solution
+
+# 超过求解时限后再等多久才结束进程，留出 Kociemba 搜索到期后返回结果的时间
+_KILL_GRACE = 0.5
+
+
+def _solve_one(cube_state: str, method: str, options: dict) -> Solution:
+    return Cube(cube_state).solve(method, **options)
+
+
+def _solve_worker(conn):
+    """工作进程：加载剪枝表后逐个求解主进程发来的状态，结果或异常通过 conn 发回"""
+    warmup()
+    conn.send(None)  # 剪枝表已加载
+    while (task := conn.recv()) is not None:
+        try:
+            result = _solve_one(*task)
+        except Exception as e:
+            result = e
+        conn.send(result)
+
+
+class _Worker:
+    """一个求解进程，同一时间只求解一个状态"""
+
+    def __init__(self, ctx):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_solve_worker, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self.ready = False
+        self.task: tuple[int, float | None] | None = None  # (序号, 截止时间)
+
+    def submit(self, index: int, task: tuple, timeout: float | None):
+        """分配任务，从这里开始计时"""
+        self.conn.send(task)
+        deadline = time.monotonic() + timeout + _KILL_GRACE if timeout else None
+        self.task = (index, deadline)
+
+    def stop(self):
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+
+def solve_many(
+    states: Iterable[str],
+    method: str = "kociemba",
+    workers: int | None = None,
+    ordered: bool = False,
+    timeout: float | None = None,
+    **options,
+) -> Iterator[tuple[int, Solution | Exception]]:
+    """
+    用多进程批量求解魔方
+
+    工作进程由 forkserver 创建，各自加载剪枝表，
+    已导出共享剪枝表 (见 cube.tables) 时只是映射同一份页缓存。
+    每个进程同一时间只求解一个状态，状态分配给进程时才开始计时；
+    超时的进程直接结束并换一个新进程，不影响后面的状态。
+
+    Args:
+        states: 魔方状态字符串
+        method: 求解方法，同 Cube.solve
+        workers: 工作进程数，默认为 CPU 核数
+        ordered: 是否按输入顺序返回，默认按完成顺序返回
+        timeout: 每个状态的求解时限（秒），超时返回 TimeoutError。
+                 对 kociemba 和 optimal 同时作为搜索时间预算
+        options: 传给 Cube.solve 的其他参数
+
+    Yields:
+        (序号, Solution)，求解失败时为 (序号, 异常)
+    """
+    if method in ("kociemba", "optimal") and timeout is not None:
+        options.setdefault("timeout", timeout)
+    workers = workers or os.cpu_count() or 1
+
+    ctx = multiprocessing.get_context("forkserver")
+    pool = [_Worker(ctx) for _ in range(workers)]
+    items = enumerate(states)
+    exhausted = False
+
+    buffered: dict[int, Solution | Exception] = {}
+    next_index = 0
+    try:
+        while True:
+            for worker in pool:
+                if exhausted or not worker.ready or worker.task is not None:
+                    continue
+                item = next(items, None)
+                if item is None:
+                    exhausted = True
+                    break
+                index, state = item
+                worker.submit(index, (state, method, options), timeout)
+
+            busy = [worker for worker in pool if worker.task is not None]
+            if exhausted and not busy:
+                break
+            deadlines = [w.task[1] for w in busy if w.task[1] is not None]
+            wait_time = max(min(deadlines) - time.monotonic(), 0) if deadlines else None
+            readable = wait([worker.conn for worker in pool], timeout=wait_time)
+
+            finished = []
+            now = time.monotonic()
+            for i, worker in enumerate(pool):
+                # 进程异常退出或超时时结束它，换一个新进程
+                replace = False
+                deadline = worker.task[1] if worker.task else None
+                if worker.conn in readable:
+                    try:
+                        result = worker.conn.recv()
+                    except EOFError:
+                        if worker.task is None:
+                            raise RuntimeError("求解进程启动失败") from None
+                        result = RuntimeError(
+                            f"第 {worker.task[0]} 个魔方的求解进程异常退出"
+                        )
+                        replace = True
+                    else:
+                        if not worker.ready:
+                            worker.ready = True
+                            continue
+                elif deadline is not None and now >= deadline:
+                    result = TimeoutError(f"第 {worker.task[0]} 个魔方求解超时")
+                    replace = True
+                else:
+                    continue
+
+                finished.append((worker.task[0], result))
+                worker.task = None
+                if replace:
+                    worker.stop()
+                    pool[i] = _Worker(ctx)
+
+            for index, result in finished:
+                if not ordered:
+                    yield index, result
+                    continue
+                buffered[index] = result
+                while next_index in buffered:
+                    yield next_index, buffered.pop(next_index)
+                    next_index += 1
+    finally:
+        for worker in pool:
+            worker.stop()
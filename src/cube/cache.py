@@ -0,0 +1,282 @@
+"""
+求解结果缓存
+
+两级缓存：内存 LRU + 磁盘 sqlite。
+
+缓存键是对称规范化后的魔方状态：对 24 种整体朝向分别转动，并按中心块重新标注颜色，
+取字典序最小的结果。同一个打乱换个朝向或配色拿在手里也能命中，
+命中后把解法中的面标识映射回当前朝向。
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .orientation import (
+    CENTER_POSITIONS,
+    FACES,
+    PERMUTATIONS,
+    ROTATIONS,
+    STANDARD_CENTERS,
+    centers,
+    find_standard_rotation,
+    rotate,
+)
+from .typing import Move
+
+CACHE_PATH = "data/cache/solutions.db"
+
+
+def _face_map(ops: str) -> dict[str, str]:
+    """整体转动后，原来每个面转到了哪个面"""
+    perm = PERMUTATIONS[ops]
+    return {
+        FACES[idx]: FACES[perm.index(pos) // 9]
+        for idx, pos in enumerate(CENTER_POSITIONS)
+    }
+
+
+def _relative_rotation(first: str, target: str) -> str:
+    """查找整体转动 h，使得先转 first 再转 h 等价于转 target"""
+    perm_first, perm_target = PERMUTATIONS[first], PERMUTATIONS[target]
+    for ops, perm in PERMUTATIONS.items():
+        if [perm_first[i] for i in perm] == perm_target:
+            return ops
+    raise ValueError(f"无效的整体转动: {first} -> {target}")
+
+
+def _translate(moves: str, face_map: dict[str, str]) -> str:
+    """替换转动序列中的面标识，比如 R -> F"""
+    return moves.translate(str.maketrans(face_map))
+
+
+def canonicalize(cube_state: str) -> tuple[str, str] | None:
+    """
+    对称规范化
+
+    Returns:
+        (规范化状态, 对应的整体转动)，中心块颜色无效时返回 None
+    """
+    if find_standard_rotation(cube_state) is None:
+        return None
+    best = None
+    for ops in ROTATIONS:
+        rotated = rotate(cube_state, ops)
+        relabel = str.maketrans(centers(rotated), STANDARD_CENTERS)
+        candidate = (rotated.translate(relabel), ops)
+        if best is None or candidate < best:
+            best = candidate
+    return best
+
+
+def _length(moves: str) -> int:
+    """外层转动序列的步数"""
+    return sum(face in "URFDLB" for face in moves)
+
+
+class SolutionCache:
+    """
+    求解结果缓存
+
+    每条缓存记录解法及找到它时的搜索预算 (timeout, target_length)。查询时只返回满足本次
+    搜索要求的解法：步数不超过 max_length，并且已经达到本次的 target_length，
+    或者当时的搜索至少和本次一样充分 (target_length 不更大、timeout 不更短)。
+    否则视为未命中，重新搜索；写入时只保留更短的解法。
+
+    Args:
+        path: sqlite 文件路径，为 None 时只使用内存缓存。第一次写入时才创建文件
+        max_memory: 内存中最多保存的条数
+        max_disk: 磁盘上最多保存的条数，超出时淘汰最久未使用的
+    """
+
+    # 磁盘缓存的表结构版本，不一致时清空重建
+    SCHEMA_VERSION = 2
+
+    def __init__(
+        self,
+        path: str | None = CACHE_PATH,
+        max_memory: int = 1024,
+        max_disk: int = 100_000,
+    ):
+        self.path = path
+        self.max_memory = max_memory
+        self.max_disk = max_disk
+        self.hits = 0
+        self.misses = 0
+        self._memory: OrderedDict[str, tuple[str, float, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+
+    def _connect(self, create: bool = False) -> sqlite3.Connection | None:
+        """打开磁盘缓存，文件不存在且 create=False 时返回 None"""
+        if self._db is not None or not self.path:
+            return self._db
+        if not create and not os.path.isfile(self.path):
+            return None
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        (schema,) = db.execute("PRAGMA user_version").fetchone()
+        if schema != self.SCHEMA_VERSION:
+            db.execute("DROP TABLE IF EXISTS solutions")
+            db.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS solutions (key TEXT PRIMARY KEY, "
+            "moves TEXT NOT NULL, timeout REAL NOT NULL, target_length INTEGER NOT NULL, "
+            "used_at REAL NOT NULL)"
+        )
+        db.execute(
+            "CREATE INDEX IF NOT EXISTS solutions_used_at ON solutions (used_at)"
+        )
+        db.commit()
+        self._db = db
+        return db
+
+    def _remember(self, key: str, entry: tuple[str, float, int]):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, key: str) -> tuple[str, float, int] | None:
+        """查询内存和磁盘缓存，返回 (规范朝向下的解法, timeout, target_length)"""
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            return entry
+        db = self._connect()
+        if db is None:
+            return None
+        row = db.execute(
+            "SELECT moves, timeout, target_length FROM solutions WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        entry = tuple(row)
+        self._remember(key, entry)
+        db.execute("UPDATE solutions SET used_at = ? WHERE key = ?", (time.time(), key))
+        db.commit()
+        return entry
+
+    def get(
+        self,
+        cube_state: str,
+        method: str = "kociemba",
+        max_length: int | None = None,
+        timeout: float = 1.0,
+        target_length: int = 20,
+    ) -> str | None:
+        """
+        查询缓存
+
+        max_length / timeout / target_length: 本次求解的搜索预算，含义同 kociemba_solutions
+
+        Returns:
+            当前朝向下的解法 (核心格式，如 "xUR'F2")，未命中或不满足搜索要求时返回 None
+        """
+        canonical = canonicalize(cube_state)
+        if canonical is None:
+            return None
+        state, ops = canonical
+        key = f"{method}:{state}"
+
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                moves, searched_timeout, searched_target = entry
+                length = _length(moves)
+                searched_enough = (
+                    searched_target <= target_length and searched_timeout >= timeout
+                )
+                if (max_length is not None and length > max_length) or (
+                    length > target_length and not searched_enough
+                ):
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        # 缓存的是规范朝向下的解法，先转到标准朝向，再把面标识映射回来
+        standard = find_standard_rotation(cube_state)
+        back = {v: k for k, v in _face_map(_relative_rotation(standard, ops)).items()}
+        return Move.to_core(standard) + _translate(moves, back)
+
+    def put(
+        self,
+        cube_state: str,
+        moves: str,
+        method: str = "kociemba",
+        timeout: float = 1.0,
+        target_length: int = 20,
+    ):
+        """
+        写入缓存
+
+        moves: 当前朝向下的解法，需以转到标准朝向的整体转动开头 (kociemba_solve 的返回格式)
+        timeout / target_length: 找到该解法时的搜索预算
+        """
+        canonical = canonicalize(cube_state)
+        if canonical is None:
+            return
+        state, ops = canonical
+        key = f"{method}:{state}"
+
+        standard = find_standard_rotation(cube_state)
+        prefix = Move.to_core(standard)
+        rest = moves[len(prefix) :]
+        # 除开头的整体转动外，只缓存由外层转动组成的解法
+        if not moves.startswith(prefix) or not set(rest) <= set("URFDLB2'"):
+            return
+        moves = _translate(rest, _face_map(_relative_rotation(standard, ops)))
+
+        with self._lock:
+            entry = (moves, timeout, target_length)
+            cached = self._lookup(key)
+            if cached is not None and _length(cached[0]) <= _length(moves):
+                # 已有不更长的解法时保留它；本次搜索更充分时，记下本次的预算
+                more_thorough = timeout >= cached[1] and target_length <= cached[2]
+                entry = (cached[0], timeout, target_length) if more_thorough else cached
+            self._remember(key, entry)
+
+            db = self._connect(create=True)
+            if db is not None:
+                db.execute(
+                    "INSERT OR REPLACE INTO solutions "
+                    "(key, moves, timeout, target_length, used_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, *entry, time.time()),
+                )
+                (size,) = db.execute("SELECT COUNT(*) FROM solutions").fetchone()
+                if size > self.max_disk:
+                    db.execute(
+                        "DELETE FROM solutions WHERE key IN "
+                        "(SELECT key FROM solutions ORDER BY used_at LIMIT ?)",
+                        (size - self.max_disk,),
+                    )
+                db.commit()
+
+    def stats(self) -> dict:
+        """命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            disk = 0
+            db = self._connect()
+            if db is not None:
+                (disk,) = db.execute("SELECT COUNT(*) FROM solutions").fetchone()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "memory_size": len(self._memory),
+                "disk_size": disk,
+            }
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._memory.clear()
+            db = self._connect()
+            if db is not None:
+                db.execute("DELETE FROM solutions")
+                db.commit()
@@ -5,9 +5,10 @@
 import random
 from typing import Optional
 
+from .cache import SolutionCache
 from .core.cube import Cube as CoreCube
 from .solver import Solver
-from .typing import Color, Face, Move
+from .typing import Color, Face, Move, Solution
 
 INITIAL_CUBE_STR = "R" * 9 + "B" * 9 + "G" * 9 + "Y" * 9 + "W" * 9 + "O" * 9
 
@@ -43,10 +44,38 @@ class Cube(CoreCube):
         self.moves(moves)
         return moves
 
-    def solve(self, method: str = "kociemba"):
-        """解决魔方"""
-        solver = Solver(self)
-        solution = solver.solve(method)
+    def solve(
+        self,
+        method: str = "kociemba",
+        cache: Optional[SolutionCache] = None,
+        **options,
+    ):
+        """
+        解决魔方
+
+        method: optimal 求最少步数（需先生成数据表，见 cube.optimal），kociemba 或 cfop
+        cache: 求解结果缓存，只缓存 Kociemba 的解法，只使用满足本次搜索预算的缓存解法
+        options: Kociemba 搜索预算，比如 timeout=0.05 快速返回第一个解，
+                 target_length=18 搜索更短的解，见 cube.kociemba.kociemba_solutions
+        """
+        state = str(self)
+        # 只有满足本次搜索预算的缓存解法才会被使用
+        budget = {
+            key: options[key] for key in ("timeout", "target_length") if key in options
+        }
+        cached = None
+        if cache and method == "kociemba":
+            cached = cache.get(
+                state, method, max_length=options.get("max_length"), **budget
+            )
+        if cached is not None:
+            solution = Solution(align=cached, cross="", f2l="", oll="", pll="")
+        else:
+            solver = Solver(self)
+            solution = solver.solve(method, **options)
+            # CFOP 兜底的解法不写入缓存
+            if cache and method == "kociemba" and not solution.cross:
+                cache.put(state, solution.align, method, **budget)
         self.moves(solution.ops)
         return solution
 
@@ -1,4 +1,15 @@
-import twophase.solver as sv
+import multiprocessing
+import queue
+import threading
+import time
+from typing import Callable
+
+from .orientation import find_standard_rotation, rotate
+from .typing import Move
+
+_solver = None
+_solver_lock = threading.Lock()
+_solver_ready = threading.Event()
 
 # 固定的颜色到面映射 (基于初始还原状态的定义)
 # FRONT=红, LEFT=蓝, RIGHT=绿, UP=黄, DOWN=白, BACK=橙
@@ -51,15 +62,45 @@ def check_centers_standard(cube_state: str) -> bool:
     return True
 
 
-def kociemba_solve(cube_state: str):
+def warmup():
     """
-    Kociemba 方法求解魔方
+    加载 twophase 求解器及其剪枝表
 
-    cube_state: 54 字符的魔方状态字符串，顺序为 FRONT, LEFT, RIGHT, UP, DOWN, BACK
-                颜色使用 R(红), B(蓝), G(绿), Y(黄), W(白), O(橙)
+    首次安装时会在当前目录的 twophase 文件夹下生成剪枝表，耗时较长。
+    如果已导出共享剪枝表（见 cube.tables），剪枝表直接来自只读 mmap，不再读入私有内存。
+    重复调用是安全的，加载中的调用会等待加载完成。
+    """
+    global _solver
+    with _solver_lock:
+        if _solver is None:
+            start = time.perf_counter()
+            from .tables import import_twophase
 
-    注意: Kociemba 算法只支持标准操作 (U, R, F, D, L, B)，不支持改变中心块的操作。
-          如果中心块不在标准位置，返回的解法会还原到"每面同色"状态，但可能不是初始还原状态。
+            _solver = import_twophase()
+            _solver_ready.set()
+            print(
+                f"✅ Kociemba 剪枝表加载完成，耗时 {time.perf_counter() - start:.2f}s"
+            )
+    return _solver
+
+
+def start_warmup() -> threading.Thread:
+    """在后台线程中预加载剪枝表"""
+    thread = threading.Thread(target=warmup, name="kociemba-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def is_ready() -> bool:
+    """剪枝表是否已加载完成"""
+    return _solver_ready.is_set()
+
+
+def to_kociemba_state(cube_state: str) -> str | None:
+    """
+    转换为 twophase 的 URFDLB 面标识字符串
+
+    中心块不在标准位置时返回 None
     """
     # 检查中心块是否在标准位置
     centers_standard = check_centers_standard(cube_state)
@@ -75,24 +116,19 @@ def kociemba_solve(cube_state: str):
         reordered += cube_state[start:end]
 
     # 颜色映射: 使用固定映射转换为 URFDLB 面标识
-    kociemba_state = "".join([COLOR_TO_FACE[c] for c in reordered])
+    return "".join([COLOR_TO_FACE[c] for c in reordered])
 
-    # 调用 Kociemba 求解
-    solutions = sv.solve(kociemba_state, 20, 1)
-    if "Error" in solutions:
-        return None
 
-    # 移除最后的步数统计 (如 "(17f)")
-    solutions = " ".join(solutions.split(" ")[:-1])
-    if not solutions:
-        return ""
+def format_moves(moves) -> str:
+    """
+    转换 twophase 的转动序列格式
 
-    # 转换格式: "U1 R3 F2" -> "UR'F2" (不带空格，兼容 Move.from_core)
-    # Kociemba 格式: 1=顺时针90°, 2=180°, 3=逆时针90°
+    [U1, R3, F2] -> "UR'F2" (不带空格，兼容 Move.from_core)
+    Kociemba 格式: 1=顺时针90°, 2=180°, 3=逆时针90°
+    """
     converted = []
-    for move in solutions.split():
-        face = move[0]
-        count = move[1] if len(move) > 1 else "1"
+    for move in moves:
+        face, count = move.name[0], move.name[1]
         if count == "1":
             converted.append(face)
         elif count == "2":
@@ -100,3 +136,449 @@ def kociemba_solve(cube_state: str):
         elif count == "3":
             converted.append(f"{face}'")
     return "".join(converted)
+
+
+def search_directions(cubie_cube) -> list[int]:
+    """
+    需要搜索的方向 (与 twophase.solver.solve 相同)
+
+    返回值 i 表示沿长对角线旋转 120° * (i % 3)，i // 3 == 1 时求解逆魔方
+    """
+    syms = cubie_cube.symmetries()
+    if {16, 20, 24, 28} & set(syms):  # 沿长对角线有旋转对称，只搜索一个方向及其逆
+        directions = [0, 3]
+    else:
+        directions = list(range(6))
+    if set(range(48, 96)) & set(syms):  # 有反对称，不搜索逆魔方
+        directions = [i for i in directions if i < 3]
+    return directions
+
+
+class _SolutionList(list):
+    """twophase 搜索线程找到更短的解时会 append 到这里，同时通知回调"""
+
+    def __init__(self, on_append):
+        super().__init__()
+        self._on_append = on_append
+
+    def append(self, moves):
+        super().append(moves)
+        self._on_append(moves)
+
+
+class _SharedFlag:
+    """跨进程共享的终止标记，提供 twophase 用到的 threading.Event 接口"""
+
+    def __init__(self, ctx):
+        self._value = ctx.RawValue("b", 0)
+
+    def is_set(self) -> bool:
+        return self._value.value == 1
+
+    def set(self):
+        self._value.value = 1
+
+    def clear(self):
+        self._value.value = 0
+
+
+class _SharedLength:
+    """跨进程共享的最短解长度，提供 twophase 用到的 [length] 列表接口"""
+
+    def __init__(self, ctx, length: int):
+        self._value = ctx.RawValue("i", length)
+        self._lock = ctx.Lock()
+
+    def __getitem__(self, _) -> int:
+        return self._value.value
+
+    def __setitem__(self, _, length: int):
+        with self._lock:
+            if length < self._value.value:
+                self._value.value = length
+
+    def reset(self, length: int):
+        with self._lock:
+            self._value.value = length
+
+
+def _search_worker(tasks, found, terminated, shortest_length):
+    """常驻搜索进程：逐个搜索主进程分配的方向，找到的解和搜索结束标记都通过 found 发回"""
+    sv = warmup()
+    found.put((0, None))  # 剪枝表已加载
+    while (task := tasks.get()) is not None:
+        job, kociemba_state, direction, target_length, timeout, start_time = task
+        fc = sv.face.FaceCube()
+        fc.from_string(kociemba_state)
+        solutions = _SolutionList(
+            lambda moves, job=job: found.put((job, [int(m) for m in moves]))
+        )
+        sv.SolverThread(
+            fc.to_cubie_cube(),
+            direction % 3,
+            direction // 3,
+            target_length,
+            timeout,
+            start_time,
+            solutions,
+            terminated,
+            shortest_length,
+        ).run()
+        found.put((job, None))
+
+
+# 并行搜索时等待搜索进程的轮询间隔，每次等待超时都检查进程是否还活着
+_POLL_INTERVAL = 0.1
+# 通知搜索退出后，最多等多久让所有方向报告结束
+_TERMINATE_GRACE = 1.0
+
+
+class _SearchPool:
+    """
+    常驻的多进程搜索池，每个搜索方向一个进程
+
+    进程在第一次并行搜索时启动并一直复用。使用 forkserver 而不是 fork：
+    调用方进程里有日志、音量、预加载等线程，多线程进程中 fork 可能死锁，
+    forkserver 从单线程的服务进程中创建子进程。
+    子进程各自加载剪枝表，已导出共享剪枝表 (见 cube.tables) 时只是映射同一份页缓存。
+    同一时间只进行一次并行搜索。
+    等待搜索进程时总是带超时并检查进程是否存活，进程退出时抛出 RuntimeError 而不是一直等待。
+    """
+
+    def __init__(self, workers: int = 6):
+        ctx = multiprocessing.get_context("forkserver")
+        self.lock = threading.Lock()
+        self.terminated = _SharedFlag(ctx)
+        self._shortest_length = _SharedLength(ctx, 999)
+        self._tasks = ctx.Queue()
+        self._found = ctx.Queue()
+        self._job = 0
+        self._running = 0  # 当前搜索中还没有结束的方向数
+
+        self._processes = [
+            ctx.Process(
+                target=_search_worker,
+                args=(self._tasks, self._found, self.terminated, self._shortest_length),
+                daemon=True,
+            )
+            for _ in range(workers)
+        ]
+        try:
+            for process in self._processes:
+                process.start()
+            # 等所有进程加载完剪枝表，避免加载时间计入第一次搜索的时间预算
+            for _ in range(workers):
+                self._receive()
+        except BaseException:
+            self.close()
+            raise
+
+    def alive(self) -> bool:
+        """所有搜索进程是否都在运行"""
+        return all(process.is_alive() for process in self._processes)
+
+    def close(self):
+        """结束所有搜索进程"""
+        for process in self._processes:
+            if process.is_alive():
+                process.kill()
+        for process in self._processes:
+            if process.pid is not None:
+                process.join()
+
+    def _receive(self, timeout: float | None = None):
+        """
+        取一条搜索进程发回的消息
+
+        超时抛出 queue.Empty，有搜索进程退出时抛出 RuntimeError
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = _POLL_INTERVAL
+            if end is not None:
+                wait = min(max(end - time.monotonic(), 0), wait)
+            try:
+                return self._found.get(timeout=wait)
+            except queue.Empty:
+                if not self.alive():
+                    raise RuntimeError("并行搜索进程已退出") from None
+                if end is not None and time.monotonic() >= end:
+                    raise
+
+    def start(self, kociemba_state: str, directions, initial_length: int, *budget):
+        """开始搜索，budget 为 (target_length, timeout, start_time)"""
+        # 上一次搜索可能被提前停止，等它的进程都退出搜索 (已设置终止标记，很快结束)
+        while self._running:
+            try:
+                if self._receive(_TERMINATE_GRACE)[1] is None:
+                    self._running -= 1
+            except queue.Empty:
+                raise RuntimeError("上一次并行搜索没有按时结束") from None
+
+        self.terminated.clear()
+        self._shortest_length.reset(initial_length)
+        self._job += 1
+        self._running = len(directions)
+        for direction in directions:
+            self._tasks.put((self._job, kociemba_state, direction, *budget))
+
+    def get(self, timeout: float | None = None):
+        """
+        返回下一个解，所有方向都搜索结束时返回 None
+
+        超时抛出 queue.Empty，有搜索进程退出时抛出 RuntimeError
+        """
+        while self._running:
+            job, moves = self._receive(timeout)
+            if moves is None:
+                self._running -= 1
+            elif job == self._job:
+                return moves
+        return None
+
+
+_search_pool: _SearchPool | None = None
+_search_pool_lock = threading.Lock()
+
+
+def start_search_pool() -> _SearchPool:
+    """
+    启动 (或返回已启动的) 并行搜索进程池
+
+    已有进程退出的进程池会被关闭并重新启动，进程启动失败时抛出 RuntimeError
+    """
+    global _search_pool
+    with _search_pool_lock:
+        if _search_pool is not None and not _search_pool.alive():
+            _search_pool.close()
+            _search_pool = None
+        if _search_pool is None:
+            _search_pool = _SearchPool()
+    return _search_pool
+
+
+def _close_search_pool(pool: _SearchPool):
+    """关闭出错的进程池，下次并行搜索时重新启动"""
+    global _search_pool
+    with _search_pool_lock:
+        if _search_pool is pool:
+            _search_pool = None
+    pool.close()
+
+
+def _start_parallel_search(
+    kociemba_state: str, directions, initial_length: int, target_length: int, timeout
+):
+    """
+    在进程池中开始搜索，返回 (持有 lock 的进程池, 开始时间)；进程池不可用时返回 None
+
+    进程池启动和等待 lock 的时间不计入时间预算
+    """
+    try:
+        pool = start_search_pool()
+    except RuntimeError as e:
+        print(f"⚠️  {e}，改用线程搜索")
+        return None
+    pool.lock.acquire()
+    start_time = time.monotonic()
+    try:
+        pool.start(
+            kociemba_state,
+            directions,
+            initial_length,
+            target_length,
+            timeout,
+            start_time,
+        )
+    except RuntimeError as e:
+        pool.lock.release()
+        _close_search_pool(pool)
+        print(f"⚠️  {e}，改用线程搜索")
+        return None
+    except BaseException:
+        pool.lock.release()
+        raise
+    return pool, start_time
+
+
+def _thread_search(sv, cc, directions, initial_length: int, *budget):
+    """
+    在当前进程中用线程搜索，budget 为 (target_length, timeout, start_time)
+
+    Returns:
+        (终止标记, 取下一个解的函数)，所有方向都搜索结束时取到 None
+    """
+    found = queue.Queue()
+    terminated = threading.Event()
+    solutions = _SolutionList(found.put)
+    shortest_length = [initial_length]
+    workers = [
+        sv.SolverThread(
+            cc,
+            i % 3,
+            i // 3,
+            *budget,
+            solutions,
+            terminated,
+            shortest_length,
+        )
+        for i in directions
+    ]
+
+    def run():
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        found.put(None)  # 搜索结束
+
+    threading.Thread(target=run, name="kociemba-search", daemon=True).start()
+    return terminated, found.get
+
+
+def kociemba_solutions(
+    cube_state: str,
+    max_length: int | None = None,
+    timeout: float = 1.0,
+    target_length: int = 20,
+    parallel: bool = False,
+):
+    """
+    Kociemba 方法求解魔方，逐个返回越来越短的解法
+
+    Args:
+        cube_state: 54 字符的魔方状态字符串，格式同 kociemba_solve
+        max_length: 解法的最大步数，更长的解法会被忽略
+        timeout: 搜索时间预算（秒），超时后停止搜索，只返回已找到的解。
+                 还没有找到解时：不限制 max_length 则和 twophase 一样继续搜索到第一个解
+                 (通常只需几十毫秒)；限制了 max_length 时可能无解，到期即停止，调用方可以退回 CFOP
+        target_length: 找到不超过该步数的解后立即停止搜索
+        parallel: 每个搜索方向 (3 个对角线方向 x 原魔方/逆魔方) 使用单独的进程 (见 start_search_pool)，
+                  进程间共享截止时间和已找到的最短长度。默认在当前进程中用线程搜索，受 GIL 限制
+
+    Yields:
+        解法字符串 (如 "UR'F2")，每个都比上一个更短。
+        中心块不在标准位置时，解法以转到标准朝向的整体转动开头 (如 "xy'UR'F2")
+    """
+    # 先整体转动到标准朝向，Kociemba 只处理中心块在标准位置的魔方
+    rotation = find_standard_rotation(cube_state)
+    if rotation is None:
+        return
+    prefix = Move.to_core(rotation)
+    kociemba_state = to_kociemba_state(rotate(cube_state, rotation))
+    if kociemba_state is None:
+        return
+
+    # 剪枝表未加载时会等待加载完成
+    sv = warmup()
+    fc = sv.face.FaceCube()
+    if fc.from_string(kociemba_state) != sv.cubie.CUBE_OK:
+        return
+    cc = fc.to_cubie_cube()
+    if cc.verify() != sv.cubie.CUBE_OK:
+        return
+
+    initial_length = 999 if max_length is None else max_length + 1
+    directions = search_directions(cc)
+
+    pool = None
+    if parallel:
+        started = _start_parallel_search(
+            kociemba_state, directions, initial_length, target_length, timeout
+        )
+        if started is not None:
+            pool, start_time = started
+    if pool is None:
+        start_time = time.monotonic()
+    budget = (target_length, timeout, start_time)
+    if pool is not None:
+        terminated, next_solution = pool.terminated, pool.get
+    else:
+        terminated, next_solution = _thread_search(
+            sv, cc, directions, initial_length, *budget
+        )
+
+    best = None
+    deadline = start_time + timeout
+    try:
+        while True:
+            # 最多等到截止时间，之后通知所有搜索退出。
+            # 不限步数且还没有解时继续等第一个解，找到后立即停止。
+            # 已通知退出时最多再等 _TERMINATE_GRACE，不会因为卡住的搜索一直等待
+            wait = None
+            if terminated.is_set():
+                wait = _TERMINATE_GRACE
+            elif best is not None or max_length is not None:
+                wait = max(deadline - time.monotonic(), 0)
+            try:
+                moves = next_solution(timeout=wait)
+            except queue.Empty:
+                if not terminated.is_set():
+                    terminated.set()
+                    continue
+                if pool is not None:
+                    # 进程没有响应终止标记，下次搜索时重新启动进程池
+                    pool.lock.release()
+                    _close_search_pool(pool)
+                    pool = None
+                break
+            except RuntimeError as e:
+                # 搜索进程异常退出：关闭进程池，剩余的预算改用线程继续搜索
+                print(f"⚠️  {e}，改用线程搜索")
+                pool.lock.release()
+                _close_search_pool(pool)
+                pool = None
+                length = initial_length if best is None else best
+                terminated, next_solution = _thread_search(
+                    sv, cc, directions, length, *budget
+                )
+                continue
+            if moves is None:
+                break
+
+            # 多个搜索可能同时找到解，只返回更短的
+            if best is None or len(moves) < best:
+                best = len(moves)
+                yield prefix + format_moves(sv.Move(m) for m in moves)
+    finally:
+        # 调用方提前停止迭代时，通知搜索退出
+        terminated.set()
+        if pool is not None:
+            pool.lock.release()
+
+
+def kociemba_solve(
+    cube_state: str,
+    max_length: int | None = None,
+    timeout: float = 1.0,
+    target_length: int = 20,
+    parallel: bool = False,
+    on_solution: Callable[[str], None] | None = None,
+):
+    """
+    Kociemba 方法求解魔方
+
+    cube_state: 54 字符的魔方状态字符串，顺序为 FRONT, LEFT, RIGHT, UP, DOWN, BACK
+                颜色使用 R(红), B(蓝), G(绿), Y(黄), W(白), O(橙)
+    max_length / timeout / target_length: 搜索预算，见 kociemba_solutions
+    parallel: 是否使用多进程搜索，见 kociemba_solutions
+    on_solution: 每找到一个更短的解时回调
+
+    注意: Kociemba 算法只支持标准操作 (U, R, F, D, L, B)，不支持改变中心块的操作。
+          如果中心块不在标准位置，先用整体转动 (x/y/z) 转到标准朝向，
+          返回的解法以该整体转动开头。
+
+    Returns:
+        最短的解法字符串 (如 "UR'F2")，无解时返回 None
+    """
+    solution = None
+    for solution in kociemba_solutions(
+        cube_state,
+        max_length=max_length,
+        timeout=timeout,
+        target_length=target_length,
+        parallel=parallel,
+    ):
+        if on_solution:
+            on_solution(solution)
+    return solution
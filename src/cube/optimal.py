@@ -0,0 +1,412 @@
+"""
+最优解求解器 (IDA* + 模式数据库)
+
+在 Kociemba 的 cubie 坐标上做 IDA* 搜索，启发函数取三个模式数据库的最大值:
+- 角块: 8 个角块的排列 (8! = 40320) x 朝向 (3^7 = 2187)
+- 棱块: 12 个棱块分为两组，每组 6 个棱块的位置 (12!/6! = 665280) x 朝向 (2^6 = 64)
+
+模式数据库用 NumPy 离线生成（按层广度优先搜索），每项 4 bit 压缩存储，
+求解时用 mmap 打开。Python 中的 IDA* 适合离还原状态不远的魔方，超出预算时返回 None。
+"""
+
+import os
+import time
+
+import numpy as np
+
+from .kociemba import to_kociemba_state
+from .orientation import find_standard_rotation, rotate
+from .typing import Move
+
+OPTIMAL_VERSION = 1
+OPTIMAL_PATH = f"data/optimal/v{OPTIMAL_VERSION}"
+
+N_MOVE = 18
+N_CORNER_PERM = 40320  # 8!
+N_TWIST = 2187  # 3^7
+N_EDGE_PERM = 665280  # 12 * 11 * 10 * 9 * 8 * 7
+N_EDGE_FLIP = 64  # 2^6
+
+# 两组棱块 (twophase 的棱块编号: UR UF UL UB DR DF DL DB FR FL BL BR)
+EDGE_GROUPS = [(0, 1, 2, 3, 4, 5), (6, 7, 8, 9, 10, 11)]
+
+# 6 个棱块位置的混合进制权重 (12, 11, 10, 9, 8, 7)
+_EDGE_WEIGHTS = [11 * 10 * 9 * 8 * 7, 10 * 9 * 8 * 7, 9 * 8 * 7, 8 * 7, 7, 1]
+
+# 广度优先搜索时未访问的标记
+_UNKNOWN = 15
+
+_TABLE_NAMES = [
+    "corner_perm_move",
+    "twist_move",
+    "edge_move",
+    "edge_flip",
+    "corner_prun",
+    "edge0_prun",
+    "edge1_prun",
+]
+
+# 已加载的表 (数据表目录 -> {名称: memoryview})
+_tables: dict[str, dict[str, memoryview]] = {}
+
+
+class _Timeout(Exception):
+    pass
+
+
+# ############################################ 坐标编码 ################################################################
+
+
+def _basic_moves():
+    """18 种转动的 (cp, co, ep, eo)，顺序与 twophase.enums.Move 一致"""
+    import twophase.cubie as cubie
+
+    moves = []
+    for face in range(6):
+        cc = cubie.CubieCube()
+        for _ in range(3):
+            cc.multiply(cubie.basicMoveCube[face])
+            moves.append(
+                (
+                    np.array([int(c) for c in cc.cp]),
+                    np.array(cc.co),
+                    np.array([int(e) for e in cc.ep]),
+                    np.array(cc.eo),
+                )
+            )
+    return moves
+
+
+def _rank_perm(perms: np.ndarray) -> np.ndarray:
+    """排列 -> 序号 (Lehmer 编码)，perms.shape = (N, n)"""
+    n = perms.shape[1]
+    rank = np.zeros(len(perms), dtype=np.int64)
+    for i in range(n):
+        smaller = (perms[:, i + 1 :] < perms[:, i : i + 1]).sum(axis=1)
+        rank = rank * (n - i) + smaller
+    return rank
+
+
+def _unrank_perm(ranks: np.ndarray, n: int) -> np.ndarray:
+    """序号 -> 排列，_rank_perm 的逆运算"""
+    digits = np.zeros((len(ranks), n), dtype=np.int64)
+    rest = ranks.copy()
+    for i in range(n - 1, -1, -1):
+        digits[:, i] = rest % (n - i)
+        rest //= n - i
+    return _pick_unused(digits, n)
+
+
+def _pick_unused(digits: np.ndarray, n: int) -> np.ndarray:
+    """digits[:, j] 表示在剩余的元素中选第几小的"""
+    used = np.zeros((len(digits), n), dtype=bool)
+    result = np.zeros_like(digits)
+    rows = np.arange(len(digits))
+    for j in range(digits.shape[1]):
+        available = np.cumsum(~used, axis=1)
+        picked = np.argmax(available == digits[:, j : j + 1] + 1, axis=1)
+        result[:, j] = picked
+        used[rows, picked] = True
+    return result
+
+
+def _rank_twist(co: np.ndarray) -> np.ndarray:
+    """前 7 个角块朝向 -> 序号，co.shape = (N, 8)"""
+    rank = np.zeros(len(co), dtype=np.int64)
+    for i in range(7):
+        rank = rank * 3 + co[:, i]
+    return rank
+
+
+def _unrank_twist(ranks: np.ndarray) -> np.ndarray:
+    co = np.zeros((len(ranks), 8), dtype=np.int64)
+    rest = ranks.copy()
+    for i in range(6, -1, -1):
+        co[:, i] = rest % 3
+        rest //= 3
+    co[:, 7] = (-co[:, :7].sum(axis=1)) % 3
+    return co
+
+
+def _rank_edges(pos: np.ndarray) -> np.ndarray:
+    """6 个棱块所在位置 -> 序号，pos.shape = (N, 6)"""
+    rank = np.zeros(len(pos), dtype=np.int64)
+    for j in range(6):
+        digit = pos[:, j] - (pos[:, :j] < pos[:, j : j + 1]).sum(axis=1)
+        rank += digit * _EDGE_WEIGHTS[j]
+    return rank
+
+
+def _unrank_edges(ranks: np.ndarray) -> np.ndarray:
+    digits = np.stack(
+        [(ranks // w) % (12 - j) for j, w in enumerate(_EDGE_WEIGHTS)], axis=1
+    )
+    return _pick_unused(digits, 12)
+
+
+# ############################################ 生成数据表 ##############################################################
+
+
+def _move_tables():
+    """转动表，形状均为 (N, 18)"""
+    moves = _basic_moves()
+
+    perms = _unrank_perm(np.arange(N_CORNER_PERM), 8)
+    corner_perm_move = np.stack(
+        [_rank_perm(perms[:, cp]) for cp, _, _, _ in moves], axis=1
+    ).astype(np.uint16)
+
+    co = _unrank_twist(np.arange(N_TWIST))
+    twist_move = np.stack(
+        [_rank_twist((co[:, cp] + m_co) % 3) for cp, m_co, _, _ in moves], axis=1
+    ).astype(np.uint16)
+
+    # 棱块按块跟踪位置: 位置 q 上的棱块转动后到达 dest[q]，朝向翻转 eo[dest[q]]
+    pos = _unrank_edges(np.arange(N_EDGE_PERM))
+    edge_move = np.zeros((N_EDGE_PERM, N_MOVE), dtype=np.uint32)
+    edge_flip = np.zeros((N_EDGE_PERM, N_MOVE), dtype=np.uint8)
+    for m, (_, _, ep, eo) in enumerate(moves):
+        dest = np.argsort(ep)
+        new_pos = dest[pos]
+        edge_move[:, m] = _rank_edges(new_pos)
+        edge_flip[:, m] = (eo[new_pos] << np.arange(6)).sum(axis=1)
+
+    return corner_perm_move, twist_move, edge_move, edge_flip
+
+
+def _bfs(
+    size: int,
+    start: int,
+    neighbor,
+    max_depth: int | None = None,
+    chunk_size: int = 1 << 21,
+) -> np.ndarray:
+    """
+    从还原状态按层广度优先搜索，返回 4 bit 压缩的步数表
+
+    指定 max_depth 时只搜索到该层，更深的状态记为 max_depth + 1，仍是可采纳的下界
+    """
+    depth = np.full(size, _UNKNOWN, dtype=np.uint8)
+    depth[start] = 0
+    level = 0
+    while max_depth is None or level < max_depth:
+        frontier = np.flatnonzero(depth == level)
+        if not len(frontier):
+            break
+        for begin in range(0, len(frontier), chunk_size):
+            chunk = frontier[begin : begin + chunk_size]
+            for m in range(N_MOVE):
+                nb = neighbor(chunk, m)
+                depth[nb[depth[nb] == _UNKNOWN]] = level + 1
+        level += 1
+        print(f"  深度 {level - 1}: {len(frontier)}")
+    depth[depth == _UNKNOWN] = level + 1 if max_depth is not None else _UNKNOWN
+    return depth[0::2] | (depth[1::2] << 4)
+
+
+def _solved_edges(group) -> int:
+    return int(_rank_edges(np.array([group]))[0])
+
+
+def build_tables(path: str = OPTIMAL_PATH, max_depth: int | None = None):
+    """
+    离线生成转动表和模式数据库 (约 200MB，需要几分钟)
+
+    max_depth: 模式数据库只搜索到该深度，生成很快但启发函数较弱，只适合测试
+    """
+    start = time.perf_counter()
+    os.makedirs(path, exist_ok=True)
+
+    print("生成转动表...")
+    corner_perm_move, twist_move, edge_move, edge_flip = _move_tables()
+    tables = {
+        "corner_perm_move": corner_perm_move,
+        "twist_move": twist_move,
+        "edge_move": edge_move,
+        "edge_flip": edge_flip,
+    }
+
+    print("生成角块模式数据库...")
+    tables["corner_prun"] = _bfs(
+        N_CORNER_PERM * N_TWIST,
+        0,
+        lambda idx, m: (
+            corner_perm_move[idx // N_TWIST, m].astype(np.int64) * N_TWIST
+            + twist_move[idx % N_TWIST, m]
+        ),
+        max_depth,
+    )
+
+    for i, group in enumerate(EDGE_GROUPS):
+        print(f"生成第 {i + 1} 组棱块模式数据库...")
+        tables[f"edge{i}_prun"] = _bfs(
+            N_EDGE_PERM * N_EDGE_FLIP,
+            _solved_edges(group) * N_EDGE_FLIP,
+            lambda idx, m: (
+                (edge_move[idx >> 6, m].astype(np.int64) << 6)
+                | ((idx & 63) ^ edge_flip[idx >> 6, m])
+            ),
+            max_depth,
+        )
+
+    # 先写临时文件再重命名，避免生成中断留下不完整的表
+    for name, table in tables.items():
+        tmp_path = os.path.join(path, f"{name}.tmp.npy")
+        np.save(tmp_path, np.ascontiguousarray(table))
+        os.replace(tmp_path, os.path.join(path, f"{name}.npy"))
+
+    print(f"✅ 最优解数据表生成完成，耗时 {time.perf_counter() - start:.1f}s")
+
+
+def load_tables(path: str = OPTIMAL_PATH) -> dict[str, memoryview] | None:
+    """用 mmap 打开数据表，文件不存在时返回 None"""
+    if path in _tables:
+        return _tables[path]
+    files = {name: os.path.join(path, f"{name}.npy") for name in _TABLE_NAMES}
+    if not all(os.path.isfile(file) for file in files.values()):
+        return None
+    # memoryview 下标访问返回 int，比 numpy 标量快得多
+    _tables[path] = {
+        name: memoryview(np.load(file, mmap_mode="r").reshape(-1))
+        for name, file in files.items()
+    }
+    return _tables[path]
+
+
+# ############################################ IDA* 搜索 ##############################################################
+
+
+def _coordinates(cubie_cube) -> tuple[int, int, int]:
+    """CubieCube -> (角块坐标, 第 1 组棱块坐标, 第 2 组棱块坐标)"""
+    cp = np.array([[int(c) for c in cubie_cube.cp]])
+    co = np.array([cubie_cube.co])
+    corners = int(_rank_perm(cp)[0]) * N_TWIST + int(_rank_twist(co)[0])
+
+    ep = [int(e) for e in cubie_cube.ep]
+    edges = []
+    for group in EDGE_GROUPS:
+        pos = [ep.index(piece) for piece in group]
+        flip = sum(cubie_cube.eo[p] << j for j, p in enumerate(pos))
+        edges.append(int(_rank_edges(np.array([pos]))[0]) * N_EDGE_FLIP + flip)
+    return corners, edges[0], edges[1]
+
+
+def _prun(table: memoryview, idx: int) -> int:
+    return (table[idx >> 1] >> ((idx & 1) << 2)) & 15
+
+
+def _ida_star(
+    coords: tuple[int, int, int],
+    max_length: int,
+    deadline: float,
+    tables: dict[str, memoryview],
+):
+    """返回最短的转动序列 (twophase 转动编号)，超出 max_length 时返回 None"""
+    corner_perm_move = tables["corner_perm_move"]
+    twist_move = tables["twist_move"]
+    edge_move = tables["edge_move"]
+    edge_flip = tables["edge_flip"]
+    corner_prun = tables["corner_prun"]
+    edge0_prun = tables["edge0_prun"]
+    edge1_prun = tables["edge1_prun"]
+
+    path: list[int] = []
+    nodes = 0
+
+    def heuristic(corners, edges0, edges1):
+        return max(
+            _prun(corner_prun, corners),
+            _prun(edge0_prun, edges0),
+            _prun(edge1_prun, edges1),
+        )
+
+    def search(corners, edges0, edges1, togo, last_face):
+        nonlocal nodes
+        if togo == 0:
+            return heuristic(corners, edges0, edges1) == 0
+        nodes += 1
+        if nodes & 0xFFF == 0 and time.monotonic() > deadline:
+            raise _Timeout()
+        for m in range(N_MOVE):
+            face = m // 3
+            # 同一面连续转动，或同轴的对面按固定顺序转动
+            if last_face >= 0 and (last_face - face) in (0, 3):
+                continue
+            cp, tw = divmod(corners, N_TWIST)
+            new_corners = (
+                corner_perm_move[cp * N_MOVE + m] * N_TWIST
+                + twist_move[tw * N_MOVE + m]
+            )
+            if _prun(corner_prun, new_corners) >= togo:
+                continue
+            new_edges = []
+            for edges, prun in ((edges0, edge0_prun), (edges1, edge1_prun)):
+                i = (edges >> 6) * N_MOVE + m
+                new = (edge_move[i] << 6) | ((edges & 63) ^ edge_flip[i])
+                if _prun(prun, new) >= togo:
+                    break
+                new_edges.append(new)
+            else:
+                path.append(m)
+                if search(new_corners, *new_edges, togo - 1, face):
+                    return True
+                path.pop()
+        return False
+
+    for length in range(heuristic(*coords), max_length + 1):
+        if search(*coords, length, -1):
+            return path
+    return None
+
+
+def optimal_solve(
+    cube_state: str,
+    max_length: int = 20,
+    timeout: float = 10.0,
+    path: str = OPTIMAL_PATH,
+) -> str | None:
+    """
+    求最少步数的解法
+
+    cube_state: 54 字符的魔方状态字符串，格式同 kociemba_solve
+    max_length: 最大搜索深度
+    timeout: 搜索时间预算（秒）
+    path: 数据表目录，见 build_tables
+
+    Returns:
+        最短解法 (如 "UR'F2")，中心块不在标准位置时以整体转动开头。
+        数据表缺失或超出预算时返回 None
+    """
+    rotation = find_standard_rotation(cube_state)
+    tables = load_tables(path)
+    if rotation is None or tables is None:
+        return None
+    kociemba_state = to_kociemba_state(rotate(cube_state, rotation))
+    if kociemba_state is None:
+        return None
+
+    import twophase.cubie as cubie
+    import twophase.face as face
+
+    fc = face.FaceCube()
+    if fc.from_string(kociemba_state) != cubie.CUBE_OK:
+        return None
+    cc = fc.to_cubie_cube()
+    if cc.verify() != cubie.CUBE_OK:
+        return None
+
+    try:
+        moves = _ida_star(
+            _coordinates(cc), max_length, time.monotonic() + timeout, tables
+        )
+    except _Timeout:
+        return None
+    if moves is None:
+        return None
+    return Move.to_core(rotation) + "".join(
+        "URFDLB"[m // 3] + ("", "2", "'")[m % 3] for m in moves
+    )
+
+
+if __name__ == "__main__":
+    build_tables()
@@ -0,0 +1,78 @@
+"""
+魔方整体朝向
+
+魔方状态字符串的面顺序为 FRONT, LEFT, RIGHT, UP, DOWN, BACK。
+整体转动 (x/y/z) 只改变色块的位置，这里预先计算出 24 种朝向对应的色块置换，
+用于把任意朝向的魔方转到标准朝向（中心块 F=红, L=蓝, R=绿, U=黄, D=白, B=橙）。
+"""
+
+from .core.cube import Cube as CoreCube
+from .typing import Move
+
+# 状态字符串中的面顺序
+FACES = "FLRUDB"
+
+# 标准朝向下各面中心块的颜色
+STANDARD_CENTERS = "RBGYWO"
+
+# 中心块在状态字符串中的位置
+CENTER_POSITIONS = [idx * 9 + 4 for idx in range(6)]
+
+# 24 种整体朝向：先选择朝上的面，再绕 y 轴转动
+ROTATIONS = [
+    " ".join(op for op in (up, turn) if op)
+    for up in ("", "x", "x2", "x'", "z", "z'")
+    for turn in ("", "y", "y2", "y'")
+]
+
+# 状态字符串中的面 -> 核心魔方的面索引 (与 Face.str_to_core_cube 一致)
+_CORE_FACE_INDEX = {"F": 0, "L": 3, "R": 1, "U": 5, "D": 4, "B": 2}
+
+
+def _permutation(ops: str) -> list[int]:
+    """
+    计算整体转动后的色块置换
+
+    返回 perm，转动后位置 i 上的色块来自转动前的位置 perm[i]
+    """
+    core_cube = [[[0] * 3 for _ in range(3)] for _ in range(6)]
+    for idx, face in enumerate(FACES):
+        for row in range(3):
+            for col in range(3):
+                core_cube[_CORE_FACE_INDEX[face]][row][col] = idx * 9 + row * 3 + col
+    cube = CoreCube(core_cube)
+    cube.doMoves(Move.to_core(ops))
+    return [
+        cube.cube[_CORE_FACE_INDEX[face]][row][col]
+        for face in FACES
+        for row in range(3)
+        for col in range(3)
+    ]
+
+
+# 每种朝向对应的色块置换
+PERMUTATIONS = {ops: _permutation(ops) for ops in ROTATIONS}
+
+
+def rotate(cube_state: str, ops: str) -> str:
+    """对状态字符串应用整体转动"""
+    perm = PERMUTATIONS[ops] if ops in PERMUTATIONS else _permutation(ops)
+    return "".join(cube_state[i] for i in perm)
+
+
+def centers(cube_state: str) -> str:
+    """各面中心块颜色，顺序为 FRONT, LEFT, RIGHT, UP, DOWN, BACK"""
+    return "".join(cube_state[i] for i in CENTER_POSITIONS)
+
+
+def find_standard_rotation(cube_state: str) -> str | None:
+    """
+    查找把魔方转到标准朝向的整体转动
+
+    Returns:
+        整体转动序列 (如 "x y'"，已是标准朝向时为 "")，中心块颜色无效时返回 None
+    """
+    for ops in ROTATIONS:
+        if centers(rotate(cube_state, ops)) == STANDARD_CENTERS:
+            return ops
+    return None
@@ -1,4 +1,7 @@
+import time
+
 from cube.kociemba import kociemba_solve
+from cube.optimal import optimal_solve
 
 from .core.solver import Solver as CoreSolver
 from .typing import Solution
@@ -9,9 +12,38 @@ class Solver(CoreSolver):
         super().__init__(cube)
         self._cube_state = str(cube)
 
-    def solve(self, method: str = "kociemba"):
+    def solve(self, method: str = "kociemba", **options):
+        """
+        求解魔方
+
+        Args:
+            method: 求解方法，optimal、kociemba 或 cfop
+            options: 传给 kociemba_solve 的搜索预算 (max_length, timeout, target_length, parallel, on_solution)，
+                     optimal 只使用 max_length 和 timeout，退回 Kociemba 时只用剩余的 timeout
+        """
+        if method == "optimal":
+            start = time.monotonic()
+            moves = optimal_solve(
+                self._cube_state,
+                **{k: v for k, v in options.items() if k in ("max_length", "timeout")},
+            )
+            if moves is not None:
+                return Solution(
+                    align=moves,
+                    cross="",
+                    f2l="",
+                    oll="",
+                    pll="",
+                )
+            # 缺少数据表或超出搜索预算时，退回 Kociemba。
+            # 预算已用完时 Kociemba 只返回第一个解 (不限步数时通常只需几十毫秒)
+            method = "kociemba"
+            if "timeout" in options:
+                elapsed = time.monotonic() - start
+                options = {**options, "timeout": max(options["timeout"] - elapsed, 0.0)}
+
         if method == "kociemba":
-            moves = kociemba_solve(self._cube_state)
+            moves = kociemba_solve(self._cube_state, **options)
             if moves:
                 return Solution(
                     align=moves,
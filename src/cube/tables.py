@@ -0,0 +1,235 @@
+"""
+Kociemba 剪枝表 / 转动表的共享存储
+
+twophase 在导入时用 array.fromfile 把所有表读入进程私有内存 (约 70MB)，多个求解进程各持一份。
+这里把 twophase 生成的表文件打包为一个带版本号的二进制文件，用只读 mmap 打开。
+导入 twophase 时拦截它读取表文件的 open / array.fromfile，把模块中的表直接设为
+mmap 上的 memoryview：不产生私有副本，多个进程共享同一份页缓存。
+
+文件格式:
+    MAGIC(8 字节) + 头部长度(uint32) + 头部 JSON + 按页对齐的表数据
+"""
+
+import array
+import builtins
+import importlib.util
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from importlib.metadata import PackageNotFoundError, version
+from types import SimpleNamespace
+
+TABLES_VERSION = 2
+TABLES_PATH = f"data/kociemba/tables-v{TABLES_VERSION}.bin"
+
+_MAGIC = b"CUBETBL\0"
+_HEADER = struct.Struct("<8sI")
+
+# 在导入时读取表文件的 twophase 模块，按依赖顺序排列
+_TABLE_MODULES = [
+    "twophase.symmetries",
+    "twophase.moves",
+    "twophase.pruning",
+    "twophase.coord",
+]
+
+# 保持 mmap 的引用，避免被回收
+_mapped: mmap.mmap | None = None
+
+
+def _twophase_version() -> str:
+    try:
+        return version("rubiktwophase")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def _align(offset: int) -> int:
+    return (offset + mmap.PAGESIZE - 1) // mmap.PAGESIZE * mmap.PAGESIZE
+
+
+def export_tables(path: str = TABLES_PATH) -> str:
+    """
+    把 twophase 的表文件打包为共享存储文件
+
+    twophase 的表文件不存在时会先生成 (耗时较长)，文件以原子方式写入。
+    """
+    # 按原方式导入，确保 twophase 文件夹下的表文件都已生成
+    import twophase.solver  # noqa: F401
+    from twophase import defs
+
+    entries = []
+    offset = 0
+    for name in sorted(os.listdir(defs.FOLDER)):
+        nbytes = os.path.getsize(os.path.join(defs.FOLDER, name))
+        entries.append({"name": name, "offset": offset, "nbytes": nbytes})
+        # 偏移量相对于数据区起点，数据区紧跟头部并按页对齐
+        offset = _align(offset + nbytes)
+    header = json.dumps(
+        {
+            "version": TABLES_VERSION,
+            "twophase": _twophase_version(),
+            "tables": entries,
+        }
+    ).encode()
+    data_start = _align(_HEADER.size + len(header))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(header)))
+        f.write(header)
+        for entry in entries:
+            f.seek(data_start + entry["offset"])
+            with open(os.path.join(defs.FOLDER, entry["name"]), "rb") as table:
+                f.write(table.read())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+    size = (data_start + offset) / 1024 / 1024
+    print(f"✅ 已导出 {len(entries)} 张表到 {path}（{size:.1f}MB）")
+    return path
+
+
+def _read_header(mapped: mmap.mmap) -> tuple[dict, int] | None:
+    """读取头部，返回 (元数据, 数据区起点)"""
+    magic, header_size = _HEADER.unpack_from(mapped, 0)
+    if magic != _MAGIC:
+        return None
+    header = mapped[_HEADER.size : _HEADER.size + header_size]
+    return json.loads(header), _align(_HEADER.size + header_size)
+
+
+def _open_tables(path: str) -> tuple[mmap.mmap, dict[str, memoryview]] | None:
+    """打开共享存储文件，返回 (mmap, {表文件名: 数据})，文件不可用时返回 None"""
+    if not os.path.isfile(path):
+        return None
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    header = _read_header(mapped)
+    meta, data_start = header or ({}, 0)
+    if (
+        not header
+        or meta["version"] != TABLES_VERSION
+        or meta["twophase"] != _twophase_version()
+    ):
+        print(f"⚠️  剪枝表文件版本不匹配，已忽略: {path}")
+        mapped.close()
+        return None
+
+    data = memoryview(mapped)
+    tables = {}
+    for entry in meta["tables"]:
+        start = data_start + entry["offset"]
+        tables[entry["name"]] = data[start : start + entry["nbytes"]]
+    return mapped, tables
+
+
+class _MappedFile:
+    """代替 twophase 打开的表文件，只携带 mmap 上的数据"""
+
+    def __init__(self, name: str, data: memoryview):
+        self.name = name
+        self.data = data
+
+    def close(self):
+        pass
+
+
+class _MappedArray(array.array):
+    """
+    代替 twophase 中的 array.array
+
+    从 _MappedFile 读取时只记录 mmap 上的视图，不复制数据；
+    模块导入完成后，其中的表会被替换为这个视图。
+    """
+
+    view: memoryview | None = None
+
+    def fromfile(self, f, n: int):
+        if not isinstance(f, _MappedFile):
+            return super().fromfile(f, n)
+        if n * self.itemsize != len(f.data):
+            raise ValueError(f"剪枝表 {f.name} 与当前 twophase 不一致")
+        self.view = f.data.cast(self.typecode)
+
+
+def _exec_mapped(module_name: str, tables: dict[str, memoryview]):
+    """导入 twophase 模块，表文件的读取重定向到 mmap"""
+
+    def mapped_open(file, mode="r", *args, **kwargs):
+        name = os.path.basename(file)
+        if mode == "rb" and name in tables:
+            return _MappedFile(name, tables[name])
+        return builtins.open(file, mode, *args, **kwargs)
+
+    def isfile(file) -> bool:
+        return os.path.basename(file) in tables or os.path.isfile(file)
+
+    # 表已在共享存储中，不需要 twophase 文件夹下的原始文件
+    mapped_os = SimpleNamespace(
+        path=SimpleNamespace(**{**vars(os.path), "isfile": isfile}), mkdir=os.mkdir
+    )
+    mapped_array = SimpleNamespace(array=_MappedArray)
+
+    def mapped_import(name, globals=None, locals=None, fromlist=(), level=0):
+        if level == 0 and name == "array":
+            return mapped_array
+        if level == 0 and name == "os":
+            return mapped_os
+        return builtins.__import__(name, globals, locals, fromlist, level)
+
+    spec = importlib.util.find_spec(module_name)
+    module = importlib.util.module_from_spec(spec)
+    module.__builtins__ = {
+        **vars(builtins),
+        "__import__": mapped_import,
+        "open": mapped_open,
+    }
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+
+    for name, value in list(vars(module).items()):
+        if isinstance(value, _MappedArray) and value.view is not None:
+            setattr(module, name, value.view)
+
+
+def import_twophase(path: str = TABLES_PATH):
+    """
+    导入 twophase.solver
+
+    共享存储文件可用时，剪枝表直接来自只读 mmap，几乎不占用私有内存；
+    否则按 twophase 原来的方式从 twophase 文件夹加载 (或生成) 剪枝表。
+    """
+    global _mapped
+    if _mapped is None and not any(name in sys.modules for name in _TABLE_MODULES):
+        opened = _open_tables(path)
+        if opened is not None:
+            started = time.perf_counter()
+            try:
+                for module_name in _TABLE_MODULES:
+                    _exec_mapped(module_name, opened[1])
+                _mapped = opened[0]
+                elapsed = (time.perf_counter() - started) * 1000
+                print(f"✅ 已挂载共享剪枝表，耗时 {elapsed:.1f}ms")
+            except ValueError as e:
+                print(f"⚠️  {e}，已忽略: {path}")
+                for module_name in _TABLE_MODULES:
+                    sys.modules.pop(module_name, None)
+
+    import twophase.solver
+
+    return twophase.solver
+
+
+def is_attached() -> bool:
+    """twophase 是否正在使用共享剪枝表"""
+    return _mapped is not None
+
+
+if __name__ == "__main__":
+    export_tables()
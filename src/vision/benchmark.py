@@ -0,0 +1,154 @@
+"""
+识别流程基准测试
+
+分别统计解码、魔方定位 (find_cube_contour)、透视矫正 (perspective_correct)、
+颜色识别 (get_cube_colors) 各阶段的耗时，以及色块准确率和整面准确率，结果输出为 JSON。
+
+图片来源：
+- 目录模式：目录下的图片，标注在 labels.json 中，格式为 {"文件名": "RGBYWORGB"}
+- 合成模式：用 vision.synthetic 离线生成，不需要真实照片
+
+用法:
+    python -m vision.benchmark --synthetic 200
+    python -m vision.benchmark --dir data/images --backend onnx --output bench.json
+"""
+
+import argparse
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from vision.image import (
+    find_cube_contour,
+    get_cube_colors,
+    load_image,
+    perspective_correct,
+)
+from vision.predict import YOLOv11Predictor
+from vision.synthetic import generate
+
+STAGES = ["decode", "detect", "warp", "colors"]
+
+
+def load_samples(image_dir: str):
+    """读取目录中的图片和标注，返回 (编码后的图片数据, 颜色标注, None)"""
+    with open(os.path.join(image_dir, "labels.json"), encoding="utf-8") as f:
+        labels = json.load(f)
+    for name, colors in labels.items():
+        with open(os.path.join(image_dir, name), "rb") as f:
+            yield f.read(), colors, None
+
+
+def synthetic_samples(count: int, seed: int = 0):
+    """生成合成图片，返回 (JPEG 数据, 颜色标注, 魔方角点)"""
+    for image, colors, quad in generate(count, seed):
+        _, data = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        yield data.tobytes(), colors, quad
+
+
+def _summary(values: list[float]) -> dict:
+    """耗时统计 (毫秒)"""
+    if not values:
+        return {}
+    values = np.array(values) * 1000
+    return {
+        "mean": round(float(values.mean()), 3),
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p95": round(float(np.percentile(values, 95)), 3),
+    }
+
+
+def run(samples, reduce: int = 1, oracle: bool = False) -> dict:
+    """
+    运行基准测试
+
+    Args:
+        samples: (图片数据, 颜色标注, 魔方角点) 序列
+        reduce: 缩小解码倍数，见 load_image
+        oracle: 使用标注的魔方角点，跳过 YOLO 检测 (只有合成模式有角点)
+    """
+    timings = {stage: [] for stage in STAGES}
+    total_time = 0.0
+    count = detected = faces_correct = stickers_correct = 0
+
+    for data, label, quad in samples:
+        count += 1
+        start = time.perf_counter()
+        image = load_image(data, reduce)
+        timings["decode"].append(time.perf_counter() - start)
+
+        if oracle and quad is not None:
+            contour = quad / reduce
+        else:
+            t = time.perf_counter()
+            contour = find_cube_contour(image)
+            timings["detect"].append(time.perf_counter() - t)
+
+        if contour is not None:
+            detected += 1
+            t = time.perf_counter()
+            corrected = perspective_correct(image, contour)
+            timings["warp"].append(time.perf_counter() - t)
+
+            t = time.perf_counter()
+            colors = get_cube_colors(corrected)
+            timings["colors"].append(time.perf_counter() - t)
+
+            stickers_correct += sum(a == b for a, b in zip(colors, label, strict=True))
+            faces_correct += colors == label
+        total_time += time.perf_counter() - start
+
+    return {
+        "images": count,
+        "reduce": reduce,
+        "oracle": oracle,
+        "backend": YOLOv11Predictor.backend,
+        "stages_ms": {stage: _summary(values) for stage, values in timings.items()},
+        "total_ms": round(total_time * 1000, 3),
+        "throughput": round(count / total_time, 2) if total_time else 0.0,
+        "detection_rate": detected / count if count else 0.0,
+        "sticker_accuracy": stickers_correct / (count * 9) if count else 0.0,
+        "face_accuracy": faces_correct / count if count else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="识别流程基准测试")
+    parser.add_argument("--dir", help="带 labels.json 标注的图片目录")
+    parser.add_argument("--synthetic", type=int, default=0, help="合成图片数量")
+    parser.add_argument("--seed", type=int, default=0, help="合成图片的随机种子")
+    parser.add_argument(
+        "--backend", default="torch", help="推理后端，见 YOLOv11Predictor.configure"
+    )
+    parser.add_argument(
+        "--reduce", type=int, default=1, choices=[1, 2, 4, 8], help="缩小解码倍数"
+    )
+    parser.add_argument(
+        "--oracle", action="store_true", help="合成模式下使用标注的角点，跳过检测"
+    )
+    parser.add_argument("--output", help="结果 JSON 保存路径")
+    args = parser.parse_args()
+
+    if args.dir:
+        samples = load_samples(args.dir)
+    else:
+        samples = synthetic_samples(args.synthetic or 100, args.seed)
+
+    if not args.oracle:
+        YOLOv11Predictor.configure(args.backend)
+        YOLOv11Predictor.warmup()
+
+    report = run(samples, reduce=args.reduce, oracle=args.oracle)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"✅ 结果已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
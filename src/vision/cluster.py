@@ -0,0 +1,93 @@
+"""
+整体颜色聚类
+
+固定的 HSV 阈值对光照很敏感，一个色块匹配失败 (X) 就需要重新扫描。
+魔方每种颜色恰好 9 块，因此可以把 6 个面的 54 个色块一起聚成 6 组、每组 9 个：
+以 6 个中心块为初始中心做均衡 k-means，再把 6 组整体对应到 6 种颜色。
+"""
+
+from itertools import permutations
+
+import numpy as np
+
+# 各颜色的典型 HSV 值 (OpenCV 范围: H 0-180, S/V 0-255)，只用于给聚类结果命名
+COLOR_PROTOTYPES = {
+    "W": (0, 20, 220),
+    "Y": (28, 200, 200),
+    "O": (12, 220, 220),
+    "R": (177, 220, 180),
+    "G": (65, 200, 160),
+    "B": (110, 220, 160),
+}
+
+# 所有颜色分配方案，shape=(720, 6)
+_PERMUTATIONS = np.array(list(permutations(range(6))))
+
+
+def _features(samples: np.ndarray) -> np.ndarray:
+    """
+    HSV 转换为聚类特征
+
+    色相是环形的，用饱和度作为半径转换为平面坐标 (红色的 H=0 与 H=179 相邻，
+    白色的饱和度低，落在原点附近)，再加上明度。
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    angle = samples[:, 0] * (2 * np.pi / 180)
+    saturation = samples[:, 1]
+    return np.stack(
+        [saturation * np.cos(angle), saturation * np.sin(angle), samples[:, 2]], axis=1
+    )
+
+
+def _balanced_assign(distances: np.ndarray, fixed: list[int], size: int) -> np.ndarray:
+    """
+    均衡分配：每组恰好 size 个
+
+    fixed 中的样本 i 固定分到第 i 组，其余按距离从小到大贪心分配
+    """
+    count, groups = distances.shape
+    labels = np.full(count, -1)
+    filled = np.zeros(groups, dtype=int)
+    for group, idx in enumerate(fixed):
+        labels[idx] = group
+        filled[group] += 1
+
+    for flat in np.argsort(distances, axis=None):
+        idx, group = divmod(int(flat), groups)
+        if labels[idx] < 0 and filled[group] < size:
+            labels[idx] = group
+            filled[group] += 1
+    return labels
+
+
+def cluster_colors(samples: np.ndarray, max_iter: int = 10) -> str:
+    """
+    把 54 个色块聚成 6 种颜色
+
+    Args:
+        samples: shape=(54, 3) 的 HSV 中值，顺序同魔方状态字符串 (每面 9 个，中心块在每面第 5 个)
+        max_iter: k-means 最大迭代次数
+
+    Returns:
+        54 字符的颜色字符串
+    """
+    features = _features(samples)
+    center_idx = [face * 9 + 4 for face in range(6)]
+    centroids = features[center_idx]
+
+    labels = None
+    for _ in range(max_iter):
+        distances = np.linalg.norm(features[:, None] - centroids[None], axis=2)
+        new_labels = _balanced_assign(distances, center_idx, 9)
+        if labels is not None and (new_labels == labels).all():
+            break
+        labels = new_labels
+        centroids = np.stack([features[labels == k].mean(axis=0) for k in range(6)])
+
+    # 选择总距离最小的颜色分配方案
+    names = list(COLOR_PROTOTYPES)
+    prototypes = _features(np.array([COLOR_PROTOTYPES[name] for name in names]))
+    cost = np.linalg.norm(centroids[:, None] - prototypes[None], axis=2)
+    best = _PERMUTATIONS[cost[np.arange(6), _PERMUTATIONS].sum(axis=1).argmin()]
+
+    return "".join(names[best[label]] for label in labels)
@@ -0,0 +1,95 @@
+"""
+对比各推理后端的 CPU 延迟和检测结果
+
+以 torch 后端的检测框为基准，统计其他后端与它的一致程度: 魔方框的平均 IoU 和
+torch 检测到而该后端漏检的图片数。这不是检测准确率，只反映导出和量化带来的偏差。
+
+用法: python -m vision.compare_backends [后端 ...]
+"""
+
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from vision.predict import MODEL_PATHS, YOLOv11Predictor
+
+
+def _cube_box(detections):
+    """取置信度最高的魔方框"""
+    boxes = [d for d in detections if d["class_name"] == "cube"]
+    if not boxes:
+        return None
+    return max(boxes, key=lambda d: d["confidence"])["bbox"]
+
+
+def _iou(a, b) -> float:
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(x2 - x1, 0) * max(y2 - y1, 0)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def run_backend(backend: str, images: list[np.ndarray]):
+    """
+    用指定后端逐张预测
+
+    Returns:
+        (每张图片的耗时(毫秒), 每张图片的魔方框)
+    """
+    YOLOv11Predictor.configure(backend)
+    # 第一次推理包含初始化开销，不计入
+    predictor = YOLOv11Predictor.warmup()
+
+    times, boxes = [], []
+    for image in images:
+        start = time.perf_counter()
+        results = predictor.model.predict(
+            image, conf=0.5, iou=0.5, device=predictor.device, verbose=False
+        )
+        detections = predictor._get_detection_info(results[0])
+        times.append((time.perf_counter() - start) * 1000)
+        boxes.append(_cube_box(detections))
+    return times, boxes
+
+
+def main(backends: list[str], image_dir: str = "data/images"):
+    images = [
+        cv2.imread(os.path.join(image_dir, f)) for f in sorted(os.listdir(image_dir))
+    ]
+    images = [image for image in images if image is not None]
+    if not images:
+        print(f"❌ {image_dir} 中没有图片")
+        return
+
+    baseline = None
+    print(
+        f"{'后端':<16}{'平均(ms)':>10}{'P50(ms)':>10}{'P95(ms)':>10}"
+        f"{'一致IoU':>10}{'相对漏检':>8}"
+    )
+    for backend in ["torch"] + [b for b in backends if b != "torch"]:
+        if not os.path.exists(MODEL_PATHS[backend]):
+            print(f"⚠️ 未找到 {MODEL_PATHS[backend]}，跳过 {backend}")
+            continue
+        times, boxes = run_backend(backend, images)
+        if baseline is None:
+            baseline = boxes
+
+        # 与 torch 的一致程度，不是相对人工标注的准确率
+        pairs = list(zip(baseline, boxes, strict=True))
+        agreement = [_iou(a, b) for a, b in pairs if a and b]
+        missed = sum(1 for a, b in pairs if a and not b)
+        print(
+            f"{backend:<16}{np.mean(times):>10.1f}{np.percentile(times, 50):>10.1f}"
+            f"{np.percentile(times, 95):>10.1f}"
+            f"{np.mean(agreement) if agreement else 0:>10.3f}{missed:>8}"
+        )
+
+    YOLOv11Predictor.configure("torch")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or list(MODEL_PATHS))
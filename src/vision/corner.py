@@ -0,0 +1,186 @@
+"""
+斜角拍摄识别三个面
+
+从魔方的一个角斜着拍摄时能同时看到三个面 (上、前、右)，魔方的轮廓是一个六边形。
+在 YOLO 检测框内用 GrabCut 分割出魔方轮廓，拟合六边形，再估计三个面交汇的角点，
+就能分别透视矫正三个面。翻转魔方再拍一张看到另外三个面，两张照片即可得到完整状态。
+
+六边形顶点从最上方开始顺时针命名为 T, UR, LR, B, LL, UL，三个面交汇的角点为 C：
+
+          T
+      UL     UR
+          C
+      LL     LR
+          B
+"""
+
+import cv2
+import numpy as np
+
+from cube.orientation import rotate
+from vision.image import find_cube_contour, get_cell_samples, match_colors
+
+# 第二张照片前的整体转动：向前翻转 180 度 (x2)，再把左面转到前面 (y')。
+# 转动后看到的上、前、右三面分别是原来的下、左、后面
+FLIP_ROTATION = "x2 y'"
+
+# 状态字符串中 F, R, U 面的起始位置
+_FACE_OFFSETS = {"F": 0, "R": 18, "U": 27}
+
+
+def _grabcut_mask(image: np.ndarray, box, max_side: int = 256) -> np.ndarray | None:
+    """在检测框 (稍微放大) 内分割魔方轮廓，返回原图大小的二值掩码"""
+    height, width = image.shape[:2]
+    x1, y1, x2, y2 = box
+    pad_x, pad_y = (x2 - x1) * 0.1, (y2 - y1) * 0.1
+    x1, y1 = int(max(x1 - pad_x, 0)), int(max(y1 - pad_y, 0))
+    x2, y2 = int(min(x2 + pad_x, width)), int(min(y2 + pad_y, height))
+    crop = image[y1:y2, x1:x2]
+    if crop.size == 0:
+        return None
+
+    # 缩小后分割，GrabCut 的耗时与像素数成正比
+    scale = min(max_side / max(crop.shape[:2]), 1.0)
+    small = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    mask = np.zeros(small.shape[:2], np.uint8)
+    sh, sw = small.shape[:2]
+    rect = (int(sw * 0.05), int(sh * 0.05), int(sw * 0.9), int(sh * 0.9))
+    bgd, fgd = np.zeros((1, 65), np.float64), np.zeros((1, 65), np.float64)
+    cv2.grabCut(small, mask, rect, bgd, fgd, 5, cv2.GC_INIT_WITH_RECT)
+    foreground = np.where((mask == cv2.GC_FGD) | (mask == cv2.GC_PR_FGD), 255, 0)
+
+    full = np.zeros((height, width), np.uint8)
+    full[y1:y2, x1:x2] = cv2.resize(
+        foreground.astype(np.uint8), (x2 - x1, y2 - y1), interpolation=cv2.INTER_NEAREST
+    )
+    return full
+
+
+def fit_hexagon(mask: np.ndarray) -> np.ndarray | None:
+    """
+    把魔方轮廓拟合为六边形
+
+    Returns:
+        shape=(6, 2) 的顶点，顺序为 T, UR, LR, B, LL, UL，拟合失败时返回 None
+    """
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+    hull = cv2.convexHull(max(contours, key=cv2.contourArea))
+    perimeter = cv2.arcLength(hull, True)
+
+    # 逐渐放宽精度，直到恰好剩下 6 个顶点
+    for ratio in np.linspace(0.01, 0.08, 15):
+        approx = cv2.approxPolyDP(hull, perimeter * ratio, True)
+        if len(approx) == 6:
+            break
+    else:
+        return None
+
+    points = approx.reshape(6, 2).astype(np.float32)
+    center = points.mean(axis=0)
+    # 图像坐标系 y 轴向下，按角度升序即为顺时针
+    angles = np.arctan2(points[:, 1] - center[1], points[:, 0] - center[0])
+    points = points[np.argsort(angles)]
+    top = int(np.argmin(points[:, 1]))
+    return np.roll(points, -top, axis=0)
+
+
+def face_quads(hexagon: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    计算三个面的四边形
+
+    三个面都近似平行四边形，交汇角点 C 由三个面分别估计后取平均。
+
+    Returns:
+        {面: shape=(4, 2) 的角点}，角点顺序为该面标准朝向下的左上、右上、右下、左下
+    """
+    T, UR, LR, B, LL, UL = hexagon
+    C = ((UR + UL - T) + (UL + B - LL) + (UR + B - LR)) / 3
+    return {
+        "U": np.array([T, UR, C, UL], dtype=np.float32),
+        "F": np.array([UL, C, B, LL], dtype=np.float32),
+        "R": np.array([C, UR, LR, B], dtype=np.float32),
+    }
+
+
+def unwarp(image: np.ndarray, quad: np.ndarray, size: int = 300) -> np.ndarray:
+    """按给定的角点顺序透视矫正为正方形"""
+    dst = np.array([[0, 0], [size, 0], [size, size], [0, size]], dtype=np.float32)
+    M = cv2.getPerspectiveTransform(quad, dst)
+    return cv2.warpPerspective(image, M, (size, size))
+
+
+def extract_three_faces(image: np.ndarray, box=None, service=None):
+    """
+    识别斜角照片中的三个面
+
+    Args:
+        image: BGR 图像
+        box: 魔方检测框 [x1, y1, x2, y2]，默认用 YOLO 检测
+        service: PredictorService，见 vision.image.find_cube_contour
+
+    Returns:
+        (27 个色块颜色, shape=(27, 3) 的 HSV 中值)，按 F, R, U 面的顺序排列；
+        未找到六边形轮廓时返回 None
+    """
+    if box is None:
+        # 网格拟合只能找到单个面，这里需要整个魔方的检测框
+        contour = find_cube_contour(image, use_grid=False, service=service)
+        if contour is None:
+            return None
+        box = (*contour.min(axis=0), *contour.max(axis=0))
+
+    mask = _grabcut_mask(image, box)
+    hexagon = fit_hexagon(mask) if mask is not None else None
+    if hexagon is None:
+        return None
+
+    quads = face_quads(hexagon)
+    samples = np.concatenate(
+        [get_cell_samples(unwarp(image, quads[face])) for face in "FRU"]
+    )
+    return match_colors(samples), samples
+
+
+def compose_order(rotation: str = FLIP_ROTATION) -> list[int]:
+    """
+    两张斜角照片合并为完整状态时的色块顺序
+
+    Returns:
+        54 个序号，第 i 个色块取自 (第一张的 27 个色块 + 第二张的 27 个色块) 的第 order[i] 个
+    """
+    # 用不同的字符标记每个色块，经过整体转动后再读回序号
+    labels = [chr(0x100 + idx) for idx in range(54)]
+
+    def place(offset: int) -> list[str]:
+        state = ["?"] * 54
+        for idx, face in enumerate("FRU"):
+            start = _FACE_OFFSETS[face]
+            state[start : start + 9] = labels[offset + idx * 9 : offset + idx * 9 + 9]
+        return state
+
+    # 第二张照片是转动后的状态，做逆转动回到第一张照片的朝向
+    inverse = " ".join(
+        op[0] if op.endswith("'") else op if op.endswith("2") else op + "'"
+        for op in reversed(rotation.split())
+    )
+    restored = rotate("".join(place(27)), inverse)
+    merged = [a if a != "?" else b for a, b in zip(place(0), restored, strict=True)]
+    return [ord(label) - 0x100 for label in merged]
+
+
+def compose_state(first: str, second: str, rotation: str = FLIP_ROTATION) -> str:
+    """
+    合并两张斜角照片的识别结果
+
+    Args:
+        first: 第一张照片的 27 个色块 (F, R, U 面)
+        second: 按 rotation 整体转动魔方后拍摄的 27 个色块 (F, R, U 面)
+        rotation: 两次拍摄之间的整体转动
+
+    Returns:
+        54 字符的魔方状态，面顺序为 FRONT, LEFT, RIGHT, UP, DOWN, BACK
+    """
+    colors = first + second
+    return "".join(colors[idx] for idx in compose_order(rotation))
@@ -0,0 +1,154 @@
+"""
+传统视觉定位魔方面
+
+不依赖神经网络：自适应阈值找出所有近似正方形的色块，再拟合 3x3 网格，
+得到魔方面真实的四个角点 (透视四边形，而不是检测框)。
+光照良好的近距离照片通常几毫秒就能完成，拟合失败时再使用 YOLO 检测。
+"""
+
+import cv2
+import numpy as np
+
+# 网格坐标系 (中心块为原点，格距为 1) 中魔方面的四个角点 (左上、右上、右下、左下)
+_FACE_CORNERS = np.array(
+    [[-1.5, -1.5], [1.5, -1.5], [1.5, 1.5], [-1.5, 1.5]], np.float32
+)
+
+
+def find_squares(
+    gray: np.ndarray, min_area: float, max_area: float
+) -> list[np.ndarray]:
+    """
+    找出近似正方形的色块轮廓
+
+    Returns:
+        每个色块的 4 个角点，shape=(4, 2)
+    """
+    binary = cv2.adaptiveThreshold(
+        gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, 21, -2
+    )
+    # 色块之间的黑色缝隙把色块分开，先断开细小的粘连
+    binary = cv2.morphologyEx(binary, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+    contours, _ = cv2.findContours(binary, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+
+    squares = []
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if not min_area <= area <= max_area:
+            continue
+        hull = cv2.convexHull(contour)
+        approx = cv2.approxPolyDP(hull, cv2.arcLength(hull, True) * 0.08, True)
+        if len(approx) != 4:
+            continue
+        # 实心且接近正方形 (圆角色块也能通过)
+        (_, _), (w, h), _ = cv2.minAreaRect(approx)
+        if min(w, h) / max(w, h) < 0.6 or area / cv2.contourArea(hull) < 0.85:
+            continue
+        squares.append(approx.reshape(4, 2).astype(np.float32))
+    return squares
+
+
+def fit_grid(squares: list[np.ndarray], min_cells: int = 7) -> np.ndarray | None:
+    """
+    从色块中拟合 3x3 网格
+
+    依次假设每个色块是中心块：用它的两条边作为网格方向，最近邻色块的距离作为格距，
+    把其他色块换算到网格坐标。落在 3x3 格点附近的色块最多的假设胜出，
+    再用这些色块的中心求单应矩阵，映射出魔方面的四个角点。
+
+    Returns:
+        魔方面的 4 个角点 shape=(4, 2)，拟合失败时返回 None
+    """
+    if len(squares) < min_cells:
+        return None
+    centers = np.array([square.mean(axis=0) for square in squares])
+    sides = np.array([np.linalg.norm(square[1] - square[0]) for square in squares])
+
+    best = None
+    for idx, square in enumerate(squares):
+        # 只考虑大小相近的色块
+        similar = np.abs(sides - sides[idx]) < sides[idx] * 0.35
+        offsets = centers[similar] - centers[idx]
+        distances = np.linalg.norm(offsets, axis=1)
+        neighbors = distances[distances > sides[idx] * 0.5]
+        if len(neighbors) == 0:
+            continue
+        pitch = neighbors.min()
+
+        u, v = square[1] - square[0], square[3] - square[0]
+        basis = np.stack([u / np.linalg.norm(u), v / np.linalg.norm(v)], axis=1) * pitch
+        try:
+            coords = offsets @ np.linalg.inv(basis).T
+        except np.linalg.LinAlgError:
+            continue
+        rounded = np.round(coords)
+        ok = (np.abs(coords - rounded).max(axis=1) < 0.3) & (
+            np.abs(rounded).max(axis=1) <= 1
+        )
+
+        cells = {}
+        for point, cell in zip(centers[similar][ok], rounded[ok], strict=True):
+            cells.setdefault((int(cell[0]), int(cell[1])), point)
+        if len(cells) >= min_cells and (best is None or len(cells) > len(best)):
+            best = cells
+
+    if best is None:
+        return None
+    lattice = np.array(list(best.keys()), np.float32)
+    points = np.array(list(best.values()), np.float32)
+    H, _ = cv2.findHomography(lattice, points)
+    if H is None:
+        return None
+    corners = cv2.perspectiveTransform(_FACE_CORNERS[None], H)[0]
+    return corners.astype(np.float32)
+
+
+def find_grid_contour(image: np.ndarray, max_side: int = 640) -> np.ndarray | None:
+    """
+    定位魔方面，格式同 find_cube_contour
+
+    在缩小到 max_side 的灰度图上检测，角点映射回原图坐标。
+    """
+    scale = min(max_side / max(image.shape[:2]), 1.0)
+    small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    # 每个色块至少占画面的 1/1500，最多 1/12
+    area = gray.shape[0] * gray.shape[1]
+    squares = find_squares(gray, area / 1500, area / 12)
+    corners = fit_grid(squares)
+    if corners is None:
+        return None
+    return corners / scale
+
+
+def grid_score(face: np.ndarray, band: float = 0.04, margin: float = 0.2) -> float:
+    """
+    校正后的魔方面上 3x3 网格的明显程度，与颜色识别方式无关
+
+    色块之间有黑色缝隙或颜色变化，4 条网格线上的梯度应明显强于色块内部；
+    背景、手或只对准了一部分的魔方都没有这样的网格。
+    网格线允许偏离 band 比例的边长，色块内部去掉四周 margin 比例的像素。
+
+    Returns:
+        网格线上的平均梯度与色块内部平均梯度之比
+    """
+    gray = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY).astype(np.float32)
+    grad_x = np.abs(cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=3))
+    grad_y = np.abs(cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=3))
+    height, width = gray.shape
+
+    seams = []
+    for i in (1, 2):
+        # 竖线看水平梯度，横线看垂直梯度，各取带内每行 (列) 的最大值
+        x, dx = width * i // 3, max(int(width * band), 1)
+        seams.append(grad_x[:, x - dx : x + dx + 1].max(axis=1).mean())
+        y, dy = height * i // 3, max(int(height * band), 1)
+        seams.append(grad_y[y - dy : y + dy + 1].max(axis=0).mean())
+
+    cell_h, cell_w = height // 3, width // 3
+    my, mx = int(cell_h * margin), int(cell_w * margin)
+    grad = (grad_x + grad_y)[: cell_h * 3, : cell_w * 3]
+    cells = grad.reshape(3, cell_h, 3, cell_w)[:, my : cell_h - my, :, mx : cell_w - mx]
+    # 加 1 避免纯色图片除以 0
+    return float(np.mean(seams) / (cells.mean() + 1.0))
@@ -1,24 +1,17 @@
+import io
 import os
+import struct
 
 import cv2
 import numpy as np
 
 from cube.typing import Color
+from vision.grid import find_grid_contour
 from vision.predict import YOLOv11Predictor
 
 
-def find_cube_contour(image: np.ndarray):
-    """
-    定位魔方轮廓
-
-    Args:
-        image: 图像数组(numpy.ndarray)或图像路径(str)
-
-    Returns:
-        魔方轮廓的4个角点坐标，格式为 numpy 数组 shape=(4, 2)
-        如果未检测到魔方，返回 None
-    """
-    detections = YOLOv11Predictor.predict(image)
+def _detection_to_contour(detections):
+    """从检测结果中取出魔方的边界框，转换为 4 个角点的轮廓"""
     for detection in detections:
         if detection["class_name"] == "cube":
             # 将边界框 [x1, y1, x2, y2] 转换为4个角点的轮廓
@@ -38,6 +31,33 @@ def find_cube_contour(image: np.ndarray):
     return None
 
 
+def find_cube_contour(image: np.ndarray, use_grid: bool = True, service=None):
+    """
+    定位魔方轮廓
+
+    先用传统视觉拟合色块网格 (见 vision.grid)，成功时得到真实的透视四边形；
+    失败时再用 YOLO 检测，返回检测框的四个角点。
+
+    Args:
+        image: 图像数组(numpy.ndarray)或图像路径(str)
+        use_grid: 是否先尝试网格拟合
+        service: PredictorService，传入时 YOLO 检测交给共享的批量预测服务 (见 vision.service)
+
+    Returns:
+        魔方轮廓的4个角点坐标，格式为 numpy 数组 shape=(4, 2)
+        如果未检测到魔方，返回 None
+    """
+    if use_grid and isinstance(image, np.ndarray):
+        contour = find_grid_contour(image)
+        # 瓷砖、键盘等规则的方格也能拟合出网格，格子像魔方贴纸时才跳过 YOLO
+        if contour is not None and looks_like_stickers(
+            perspective_correct(image, contour)
+        ):
+            return contour
+    detections = service.predict(image) if service else YOLOv11Predictor.predict(image)
+    return _detection_to_contour(detections)
+
+
 def perspective_correct(image: np.ndarray, contour):
     """透视矫正"""
     pts = contour.reshape(4, 2)
@@ -75,6 +95,88 @@ def perspective_correct(image: np.ndarray, contour):
     return warped
 
 
+def get_cell_pixels(image: np.ndarray, margin: float = 0.2) -> np.ndarray:
+    """
+    按 3x3 网格取出 9 个色块内部的 HSV 像素
+
+    把图像按 3x3 网格重排为 (3, 3, h, w, 3)，去掉每个格子四周 margin 比例的像素
+    （色块间的缝隙和圆角）。宽高不相等时按各自的边长切分。
+
+    Returns:
+        shape=(9, N, 3) 的 HSV 像素，按行优先顺序排列
+    """
+    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+
+    height, width = hsv.shape[:2]
+    cell_h, cell_w = height // 3, width // 3
+    grid = hsv[: cell_h * 3, : cell_w * 3].reshape(3, cell_h, 3, cell_w, 3)
+    grid = grid.swapaxes(1, 2)  # (3, 3, cell_h, cell_w, 3)
+
+    margin_y, margin_x = int(cell_h * margin), int(cell_w * margin)
+    inner = grid[:, :, margin_y : cell_h - margin_y, margin_x : cell_w - margin_x]
+    return inner.reshape(9, -1, 3)
+
+
+def get_cell_samples(image: np.ndarray, margin: float = 0.2) -> np.ndarray:
+    """
+    获取 9 个色块的 HSV 中值，所有格子一次性计算
+
+    Returns:
+        shape=(9, 3) 的 HSV 中值，按行优先顺序排列
+    """
+    return np.median(get_cell_pixels(image, margin), axis=1)
+
+
+def looks_like_stickers(
+    image: np.ndarray,
+    min_saturation: float = 60,
+    min_value: float = 120,
+    min_colored: int = 3,
+    max_spread: float = 30.0,
+) -> bool:
+    """
+    校正后的 9 个格子是否像魔方贴纸
+
+    每个格子颜色均匀 (S/V 标准差不超过 max_spread)，并且是饱和的彩色贴纸
+    (S >= min_saturation) 或明亮的白色贴纸 (V >= min_value)，其中至少 min_colored 个是彩色的
+    (灰白的瓷砖、键盘也是明亮的方格；还原状态的白色面会交给 YOLO 检测)。
+    不按色相匹配颜色，整体聚类识别颜色时同样适用。
+    """
+    if min(image.shape[:2]) < 9:
+        return False
+    pixels = get_cell_pixels(image).astype(np.float32)
+    if (pixels[:, :, 1:].std(axis=1) > max_spread).any():
+        return False
+    _, s, v = np.median(pixels, axis=1).T
+    colored = s >= min_saturation
+    return bool((colored | (v >= min_value)).all() and colored.sum() >= min_colored)
+
+
+def match_color(h: float, s: float, v: float) -> str:
+    """按 HSV 阈值匹配颜色，无法匹配时返回 X"""
+    # 首先检查白色（低饱和度，高明度）- 优先级最高
+    if s <= 50 and v >= 150:
+        return "W"
+    # 然后检查其他颜色（需要足够的饱和度）
+    if s >= 50 and v >= 50:
+        # 检查黄色（H在20-30之间）
+        if 20 <= h <= 30:
+            return "Y"
+        # 检查橙色（H在5-20之间，但要避免与红色混淆）
+        if 5 <= h < 20:
+            return "O"
+        # 检查红色（H在0-5或170-180之间）
+        if (0 <= h < 5) or (170 <= h <= 180):
+            return "R"
+        # 检查绿色（H在40-80之间）
+        if 40 <= h <= 80:
+            return "G"
+        # 检查蓝色（H在90-130之间）
+        if 90 <= h <= 130:
+            return "B"
+    return "X"
+
+
 def get_cube_colors(image: np.ndarray):
     """
     获取魔方各色块颜色
@@ -87,75 +189,177 @@ def get_cube_colors(image: np.ndarray):
     - 绿色：H在40-80之间
     - 蓝色：H在90-130之间
     """
-    # 转换到HSV颜色空间
-    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    return match_colors(get_cell_samples(image))
+
+
+def match_colors(samples: np.ndarray) -> str:
+    """逐个色块按 HSV 阈值匹配颜色"""
+    return "".join(match_color(*(int(x) for x in sample)) for sample in samples)
+
+
+# 缩小解码倍数 -> OpenCV 解码标记，JPEG 缩小解码时跳过了大部分 IDCT 计算
+_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+# 缩小解码后长边至少保留的像素数 (YOLO 的输入尺寸)
+MIN_DECODE_SIDE = 640
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def _jpeg_size(f) -> tuple[int, int] | None:
+    """逐个跳过 JPEG 段，从 SOF 段读取宽高"""
+    if f.read(2) != b"\xff\xd8":
+        return None
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        while code == 0xFF:  # 段之间的填充字节
+            code = f.read(1)[0]
+        if code == 0x01 or 0xD0 <= code <= 0xD8:  # 没有长度的标记
+            continue
+        (length,) = struct.unpack(">H", f.read(2))
+        # SOF0-SOF15，除去 DHT (C4)、JPG (C8)、DAC (CC)
+        if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+            _, height, width = struct.unpack(">BHH", f.read(5))
+            return width, height
+        f.seek(length - 2, io.SEEK_CUR)
+
+
+def image_size(image: str | bytes) -> tuple[int, int] | None:
+    """
+    只读取文件头获取 JPEG / PNG 图片的宽高，不解码像素
+
+    Args:
+        image: 图片路径或编码后的图片数据
+
+    Returns:
+        (宽, 高)，文件无法读取或不是 JPEG / PNG 时返回 None
+    """
+    try:
+        if isinstance(image, str):
+            f = open(image, "rb")
+        else:
+            f = io.BytesIO(memoryview(image))
+        with f:
+            if f.read(8) == _PNG_SIGNATURE:
+                f.seek(16)  # 跳过 IHDR 的长度和类型
+                return struct.unpack(">II", f.read(8))
+            f.seek(0)
+            return _jpeg_size(f)
+    except (OSError, IndexError, struct.error):
+        return None
+
+
+def choose_reduce(
+    image: str | bytes | np.ndarray, min_side: int = MIN_DECODE_SIDE
+) -> int:
+    """
+    选择缩小解码倍数：缩小后长边不小于 min_side 的最大倍数 (1/2/4/8)
+
+    已解码的图像数组或读取不到尺寸时不缩小
+    """
+    if isinstance(image, np.ndarray):
+        return 1
+    size = image_size(image)
+    if size is None:
+        return 1
+    long_side = max(size)
+    return max((r for r in _DECODE_FLAGS if long_side // r >= min_side), default=1)
+
+
+def decode_image(data: bytes, reduce: int = 1) -> np.ndarray | None:
+    """解码内存中的 JPEG/PNG 数据，不经过临时文件"""
+    buffer = np.frombuffer(memoryview(data), dtype=np.uint8)
+    return cv2.imdecode(buffer, _DECODE_FLAGS[reduce])
 
-    # 分割成9个色块
-    height, width = hsv.shape[:2]
-    block_size = height // 3
-    colors = []
-
-    for row in range(3):
-        for col in range(3):
-            x, y = col * block_size, row * block_size
-            roi = hsv[y : y + block_size, x : x + block_size]
-
-            # 计算ROI的HSV中值
-            hsv_median = cv2.medianBlur(roi, 5)
-            h, s, v = cv2.split(hsv_median)
-            h_med, s_med, v_med = (
-                int(np.median(h)),
-                int(np.median(s)),
-                int(np.median(v)),
-            )
 
-            # 匹配颜色（按优先级顺序）
-            matched_color = "X"
-
-            # 首先检查白色（低饱和度，高明度）- 优先级最高
-            if s_med <= 50 and v_med >= 150:
-                matched_color = "W"
-            # 然后检查其他颜色（需要足够的饱和度）
-            elif s_med >= 50 and v_med >= 50:
-                # 检查黄色（H在20-30之间）
-                if 20 <= h_med <= 30:
-                    matched_color = "Y"
-                # 检查橙色（H在5-20之间，但要避免与红色混淆）
-                elif 5 <= h_med < 20:
-                    matched_color = "O"
-                # 检查红色（H在0-5或170-180之间）
-                elif (0 <= h_med < 5) or (170 <= h_med <= 180):
-                    matched_color = "R"
-                # 检查绿色（H在40-80之间）
-                elif 40 <= h_med <= 80:
-                    matched_color = "G"
-                # 检查蓝色（H在90-130之间）
-                elif 90 <= h_med <= 130:
-                    matched_color = "B"
-
-            colors.append(matched_color)
-
-    return "".join(colors)
-
-
-def extract_colors(image_path: str, verbose: bool = False):
+def load_image(image: str | bytes | np.ndarray, reduce: int = 1) -> np.ndarray | None:
+    """
+    读取图像：路径、编码后的图片数据或已解码的图像数组
+
+    reduce: 按 1/2、1/4、1/8 缩小解码，对已解码的图像数组无效
+    """
+    if isinstance(image, np.ndarray):
+        return image
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return decode_image(image, reduce)
+    return cv2.imread(image, _DECODE_FLAGS[reduce])
+
+
+def correct_face(
+    image: np.ndarray,
+    contour: np.ndarray,
+    source: str | bytes | np.ndarray,
+    min_cell: int = 32,
+) -> np.ndarray:
+    """
+    透视校正魔方面
+
+    image 是缩小解码的图像时，校正后每个色块边长小于 min_cell 像素则以原始分辨率
+    重新解码 source，把轮廓映射回原图后再裁剪，避免色块太小取色不准
+    """
+    corrected = perspective_correct(image, contour)
+    if min(corrected.shape[:2]) < 3 * min_cell and not isinstance(source, np.ndarray):
+        full = load_image(source)
+        scale = full.shape[1] / image.shape[1]
+        corrected = perspective_correct(full, contour * scale)
+    return corrected
+
+
+def extract_colors(
+    image_path: str | bytes | np.ndarray,
+    verbose: bool = False,
+    tracker=None,
+    return_samples: bool = False,
+    reduce: int | None = None,
+    min_cell: int = 32,
+    gate=None,
+    service=None,
+):
     """
     识别魔方
 
     Args:
-        image: 图像数组(numpy.ndarray)或图像路径(str)
+        image_path: 图像路径(str)、编码后的图片数据(bytes，如 ADB 读取的 JPEG)或图像数组(numpy.ndarray)
         verbose: 是否显示详细信息
+        tracker: CubeTracker，传入时优先复用上一张照片的魔方位置
+        return_samples: 同时返回 9 个色块的 HSV 中值，用于整体聚类 (见 vision.cluster)
+        reduce: 检测时按 1/reduce 缩小解码 (1/2/4/8)，YOLO 内部本来就会缩放到 640。
+                默认按文件头中的尺寸选择缩小后长边不小于 640 的最大倍数，读取不到尺寸时不缩小
+        min_cell: 缩小后的每个色块边长小于该像素数时，再以原始分辨率解码，
+                  把检测框映射回原图后裁剪魔方区域识别颜色
+        gate: QualityGate，传入时先检查照片质量，不可用时抛出 ImageQualityError
+        service: PredictorService，见 find_cube_contour
 
     Returns:
-        魔方颜色字符串，格式为 "WYROGBX"
+        魔方颜色字符串，格式为 "WYROGBX"；return_samples 时返回 (颜色字符串, HSV 中值)
     """
-    image = cv2.imread(image_path)
-    contour = find_cube_contour(image)
+    if reduce is None:
+        reduce = choose_reduce(image_path)
+    image = load_image(image_path, reduce)
+    if image is None:
+        print("图片读取失败")
+        return
+    if gate:
+        gate.check(image)
+    if tracker:
+        contour = tracker.find_contour(image, service=service)
+    else:
+        contour = find_cube_contour(image, service=service)
     if contour is None:
         print("未检测到魔方轮廓")
         return
-    corrected = perspective_correct(image, contour)
-    colors = get_cube_colors(corrected)
+    corrected = correct_face(image, contour, image_path, min_cell)
+    samples = get_cell_samples(corrected)
+    colors = match_colors(samples)
 
     if verbose:
         print("识别到的色块颜色:", colors)
@@ -167,6 +371,8 @@ def extract_colors(image_path: str, verbose: bool = False):
         cv2.waitKey(0)
         cv2.destroyAllWindows()
 
+    if return_samples:
+        return colors, samples
     return colors
 
 
@@ -0,0 +1,150 @@
+"""
+多进程批量识别
+
+工作进程由 forkserver 创建。forkserver 启动时预加载 CPU 上的模型但不推理 (见 vision.preload)，
+工作进程 fork 后共享权重。不在推理过后的主进程中 fork：主进程的 MPS / OpenMP 线程池和推理锁
+不会被正确复制到子进程，fork 后推理可能卡死或出错。
+forkserver 每个进程只启动一次，已经由其他模块 (如 cube.kociemba 的并行搜索) 启动时预加载不生效，
+工作进程各自在 CPU 上加载模型 (模型只有几 MB，加载约 1 秒)。
+每个工作进程只用一个推理线程，独立完成解码、检测、矫正和颜色识别，
+用多进程占满所有 CPU 核，适合批量标注图片。
+
+用法: python -m vision.pool data/images --output data/images/labels.json
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterable, Iterator
+
+import cv2
+import torch
+
+from vision.image import extract_colors
+from vision.predict import YOLOv11Predictor
+
+
+def _init_worker(backend: str):
+    # 多个进程各自开多线程推理会互相抢占 CPU
+    torch.set_num_threads(1)
+    cv2.setNumThreads(1)
+    # 在第一个任务之前加载模型并预热，固定使用 CPU。
+    # forkserver 已预加载同一后端的模型时直接使用，不重新加载
+    if (
+        YOLOv11Predictor.backend != backend
+        or YOLOv11Predictor.requested_device != "cpu"
+    ):
+        YOLOv11Predictor.configure(backend, device="cpu")
+    YOLOv11Predictor.warmup()
+
+
+def _extract_one(image: str | bytes, options: dict):
+    """返回 (颜色字符串, 9 个色块的 HSV 中值列表)，未检测到魔方时为 None"""
+    result = extract_colors(image, return_samples=True, **options)
+    if result is None:
+        return None
+    colors, samples = result
+    return colors, samples.tolist()
+
+
+def extract_colors_many(
+    images: Iterable[str | bytes],
+    workers: int | None = None,
+    ordered: bool = False,
+    **options,
+) -> Iterator[tuple[int, tuple | None | Exception]]:
+    """
+    用进程池批量识别魔方
+
+    最多同时提交 2 倍工作进程数的图片，处理完一张再提交下一张，
+    images 可以是生成器，不会一次把所有图片数据读入内存。
+
+    Args:
+        images: 图片路径或编码后的图片数据
+        workers: 工作进程数，默认为 CPU 核数
+        ordered: 是否按输入顺序返回，默认按完成顺序返回
+        options: 传给 extract_colors 的其他参数，如 reduce
+
+    Yields:
+        (序号, (颜色字符串, HSV 中值))，未检测到魔方时为 (序号, None)，出错时为 (序号, 异常)
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = workers * 2
+
+    # 工作进程使用与主进程相同的推理后端，由 forkserver 预加载
+    os.environ["VISION_BACKEND"] = YOLOv11Predictor.backend
+    ctx = multiprocessing.get_context("forkserver")
+    ctx.set_forkserver_preload(["vision.preload"])
+
+    def result(future):
+        try:
+            return future.result()
+        except Exception as e:
+            return e
+
+    with ProcessPoolExecutor(
+        workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(YOLOv11Predictor.backend,),
+    ) as pool:
+        items = enumerate(images)
+        pending = {}
+        buffered = {}
+        next_index = 0
+        while True:
+            for index, image in itertools.islice(items, max_pending - len(pending)):
+                pending[pool.submit(_extract_one, image, options)] = index
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                if not ordered:
+                    yield index, result(future)
+                    continue
+                buffered[index] = result(future)
+                while next_index in buffered:
+                    yield next_index, buffered.pop(next_index)
+                    next_index += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程批量识别魔方图片")
+    parser.add_argument("image_dir", help="图片目录")
+    parser.add_argument(
+        "--output",
+        help="识别结果 JSON 保存路径，格式同 vision.benchmark 的 labels.json",
+    )
+    parser.add_argument("--workers", type=int, help="工作进程数，默认为 CPU 核数")
+    args = parser.parse_args()
+
+    names = sorted(
+        name
+        for name in os.listdir(args.image_dir)
+        if name.lower().endswith((".jpg", ".jpeg", ".png"))
+    )
+    paths = [os.path.join(args.image_dir, name) for name in names]
+
+    labels = {}
+    for index, result in extract_colors_many(paths, args.workers):
+        if isinstance(result, Exception):
+            print(f"❌ {names[index]}: {result}")
+        elif result is None:
+            print(f"⚠️ {names[index]}: 未检测到魔方轮廓")
+        else:
+            labels[names[index]] = result[0]
+            print(f"✅ {names[index]}: {result[0]}")
+
+    print(f"识别完成: {len(labels)}/{len(names)}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(labels, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,33 @@
-from typing import Union
+import glob
+import os
+import threading
+import time
+from typing import Sequence, Union
 
+import cv2
 import numpy as np
 import torch
 from ultralytics import YOLO
 
 
+# 推理后端 -> 模型路径 (onnx / openvino 由 export_model 从 data/model.pt 导出)
+MODEL_PATHS = {
+    "torch": "data/model.pt",
+    "onnx": "data/model.onnx",
+    "onnx-int8": "data/model_int8.onnx",
+    "openvino": "data/model_openvino_model",
+    "openvino-int8": "data/model_int8_openvino_model",
+}
+
+
 class YOLOv11Predictor:
     _instance = None
+    _lock = threading.Lock()
+    # ultralytics 的模型对象不是线程安全的，同一时间只允许一个推理
+    _predict_lock = threading.Lock()
+    backend = "torch"
+    # 指定的推理设备，None 时自动选择
+    requested_device: str | None = None
 
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
@@ -29,33 +50,133 @@ class YOLOv11Predictor:
             conf_threshold: 置信度阈值
             iou_threshold: IoU阈值
         """
-        self = YOLOv11Predictor()
-
-        results = self.model.predict(
-            source=source,
-            conf=conf_threshold,
-            iou=iou_threshold,
-            device=self.device,
-            verbose=verbose,
-        )
+        self = YOLOv11Predictor.load()
+
+        with self._predict_lock:
+            results = self.model.predict(
+                source=source,
+                conf=conf_threshold,
+                iou=iou_threshold,
+                device=self.device,
+                verbose=verbose,
+            )
 
         if verbose:
             results[0].plot(show=True)
 
         return self._get_detection_info(results[0])
 
-    def __init__(self, model_path="data/model.pt"):
+    @staticmethod
+    def predict_batch(
+        sources: Sequence[Union[str, np.ndarray]],
+        verbose: bool = False,
+        conf_threshold=0.5,
+        iou_threshold=0.5,
+        batch_size: int = 16,
+    ):
+        """
+        批量预测，每 batch_size 张图片做一次前向推理
+
+        Args:
+            sources: 图片路径(str)或图像数组(numpy.ndarray)列表，如一次扫描的 6 个面
+            verbose: 是否显示详细信息
+            conf_threshold: 置信度阈值
+            iou_threshold: IoU阈值
+            batch_size: 每批图片数
+
+        Returns:
+            与 sources 一一对应的检测结果列表，每项格式同 predict
+        """
+        self = YOLOv11Predictor.load()
+
+        detections = []
+        for start in range(0, len(sources), batch_size):
+            with self._predict_lock:
+                results = self.model.predict(
+                    source=list(sources[start : start + batch_size]),
+                    conf=conf_threshold,
+                    iou=iou_threshold,
+                    device=self.device,
+                    verbose=verbose,
+                )
+            detections.extend(self._get_detection_info(result) for result in results)
+
+        return detections
+
+    @classmethod
+    def configure(cls, backend: str = "torch", device: str | None = None):
+        """
+        选择推理后端，下次预测时重新加载模型
+
+        Args:
+            backend: torch / onnx / onnx-int8 / openvino / openvino-int8。
+                     导出的模型只在 CPU 上运行，前后处理与 torch 相同，检测结果格式不变
+            device: 推理设备，默认 torch 后端在 MPS 可用时使用 MPS，否则使用 CPU
+        """
+        if backend not in MODEL_PATHS:
+            raise ValueError(f"不支持的推理后端: {backend}")
+        with cls._lock:
+            cls.backend = backend
+            cls.requested_device = device
+            cls._instance = None
+
+    @classmethod
+    def load(cls) -> "YOLOv11Predictor":
+        """
+        加载模型，重复调用是安全的，只在第一次调用时加载
+        """
+        with cls._lock:
+            if cls._instance is None or not hasattr(cls._instance, "model"):
+                start = time.perf_counter()
+                cls()
+                print(
+                    f"✅ 魔方检测模型加载完成 ({cls.backend})，"
+                    f"耗时 {time.perf_counter() - start:.2f}s"
+                )
+            return cls._instance
+
+    @classmethod
+    def warmup(cls, imgsz: int | None = None) -> "YOLOv11Predictor":
+        """
+        加载模型并用空白图片推理一次
+
+        首次推理会初始化推理引擎和算子，提前完成可以避免用户等待。
+
+        Args:
+            imgsz: 预热的输入尺寸，默认使用模型训练时的输入尺寸 (没有记录时为 640)，
+                   与实际推理的尺寸不同时预热不到对应的算子
+        """
+        self = cls.load()
+        imgsz = imgsz or self.model.overrides.get("imgsz") or 640
+        start = time.perf_counter()
+        dummy = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+        with self._predict_lock:
+            self.model.predict(
+                source=dummy, imgsz=imgsz, device=self.device, verbose=False
+            )
+        print(f"✅ 魔方检测模型预热完成，耗时 {time.perf_counter() - start:.2f}s")
+        return self
+
+    def __init__(self, model_path=None):
         """初始化YOLO预测器"""
+        # 单例，模型只加载一次
+        if hasattr(self, "model"):
+            return
+
+        model_path = model_path or MODEL_PATHS[self.backend]
 
-        # 检查设备
-        if torch.backends.mps.is_available():
+        # 检查设备，导出的模型只支持 CPU
+        if self.requested_device:
+            self.device = self.requested_device
+        elif self.backend == "torch" and torch.backends.mps.is_available():
             self.device = "mps"
         else:
             self.device = "cpu"
 
-        # 加载模型
-        self.model = YOLO(model_path)
-        self.model.to(self.device)
+        # 加载模型，ultralytics 根据文件后缀选择 ONNX Runtime / OpenVINO
+        self.model = YOLO(model_path, task="detect")
+        if self.backend == "torch":
+            self.model.to(self.device)
 
     def _get_detection_info(self, results):
         """获取检测结果的详细信息"""
@@ -86,6 +207,98 @@ class YOLOv11Predictor:
         return detections
 
 
+# int8 量化的校准图片，与 OpenVINO 的 NNCF 校准使用同一份训练集
+CALIBRATION_IMAGES = "data/yolo/dataset/images/train"
+
+
+def _calibration_inputs(imgsz: int, limit: int = 200):
+    """
+    生成 int8 量化的校准输入
+
+    前处理与 ultralytics 推理一致: letterbox 到 imgsz、BGR 转 RGB、HWC 转 NCHW、归一化到 [0, 1]
+    """
+    from ultralytics.data.augment import LetterBox
+
+    letterbox = LetterBox((imgsz, imgsz), auto=False)
+    files = sorted(glob.glob(os.path.join(CALIBRATION_IMAGES, "*.jpg")))[:limit]
+    if not files:
+        raise FileNotFoundError(f"{CALIBRATION_IMAGES} 中没有校准图片")
+    for file in files:
+        image = letterbox(image=cv2.imread(file))
+        image = image[..., ::-1].transpose(2, 0, 1)[None]
+        yield np.ascontiguousarray(image, dtype=np.float32) / 255
+
+
+def export_model(backend: str, imgsz: int = 640) -> str:
+    """
+    把 data/model.pt 导出为其他推理后端的模型 (需要安装 export 可选依赖)
+
+    - onnx: ultralytics 导出 ONNX，int8 版本用 ONNX Runtime 静态量化 (QDQ)，
+      激活值的量化范围由训练集图片校准
+    - openvino: ultralytics 导出 OpenVINO IR，int8 版本用 NNCF 在训练集上校准
+
+    Returns:
+        导出的模型路径，即 MODEL_PATHS[backend]
+    """
+    model = YOLO(MODEL_PATHS["torch"])
+    if backend == "onnx":
+        model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+    elif backend == "onnx-int8":
+        import onnxruntime
+        from onnxruntime.quantization import (
+            CalibrationDataReader,
+            QuantFormat,
+            QuantType,
+            quantize_static,
+        )
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+
+        if not os.path.exists(MODEL_PATHS["onnx"]):
+            export_model("onnx", imgsz)
+        input_name = (
+            onnxruntime.InferenceSession(MODEL_PATHS["onnx"]).get_inputs()[0].name
+        )
+
+        class CalibrationReader(CalibrationDataReader):
+            def __init__(self):
+                self.inputs = _calibration_inputs(imgsz)
+
+            def get_next(self):
+                image = next(self.inputs, None)
+                return None if image is None else {input_name: image}
+
+        # 量化前先做形状推断和图优化，ONNX Runtime 推荐的预处理
+        prepared = MODEL_PATHS["onnx"].replace(".onnx", "_prepared.onnx")
+        quant_pre_process(MODEL_PATHS["onnx"], prepared)
+        try:
+            quantize_static(
+                prepared,
+                MODEL_PATHS["onnx-int8"],
+                CalibrationReader(),
+                quant_format=QuantFormat.QDQ,
+                activation_type=QuantType.QUInt8,
+                weight_type=QuantType.QInt8,
+                per_channel=True,
+            )
+        finally:
+            os.remove(prepared)
+    elif backend == "openvino":
+        model.export(format="openvino", imgsz=imgsz)
+    elif backend == "openvino-int8":
+        # ultralytics 导出到 data/model_int8_openvino_model
+        model.export(
+            format="openvino",
+            imgsz=imgsz,
+            int8=True,
+            data="data/yolo/dataset/dataset.yaml",
+        )
+    else:
+        raise ValueError(f"不支持的推理后端: {backend}")
+
+    print(f"✅ 已导出 {backend} 模型: {MODEL_PATHS[backend]}")
+    return MODEL_PATHS[backend]
+
+
 if __name__ == "__main__":
     detections = YOLOv11Predictor.predict("data/test.jpg", verbose=True)
     print("✅ done")
@@ -0,0 +1,23 @@
+"""
+forkserver 预加载模型
+
+vision.pool 用 set_forkserver_preload 让 forkserver 进程在启动时导入本模块：
+在 CPU 上加载模型但不推理，工作进程从 forkserver fork 出来后以写时复制方式共享权重，
+不必各自从磁盘加载。forkserver 中不推理，也就不会启动 OpenMP 线程池，fork 是安全的。
+torch 后端提前融合 Conv + BN，否则第一次推理时各进程会分别融合，权重又变成私有副本。
+
+推理后端由环境变量 VISION_BACKEND 指定 (forkserver 启动时继承主进程的环境变量)。
+加载失败时只打印警告，工作进程会在初始化时自己加载模型。
+"""
+
+import os
+
+from vision.predict import YOLOv11Predictor
+
+try:
+    YOLOv11Predictor.configure(os.environ.get("VISION_BACKEND", "torch"), device="cpu")
+    predictor = YOLOv11Predictor.load()
+    if YOLOv11Predictor.backend == "torch":
+        predictor.model.fuse()
+except Exception as e:
+    print(f"⚠️ forkserver 预加载模型失败，工作进程将各自加载: {e}")
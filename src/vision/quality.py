@@ -0,0 +1,91 @@
+"""
+照片质量检查
+
+在运行 YOLO 检测之前，用缩小后的灰度图在几毫秒内检查照片是否可用：
+模糊、过暗或过亮、画面空白 (比如镜头被挡住)、与上一张照片相同 (缩略图没有更新)。
+不可用时直接抛出 ImageQualityError，原因可以直接播报给用户。
+"""
+
+import cv2
+import numpy as np
+
+
+class ImageQualityError(Exception):
+    """照片不可用，异常信息为可以播报给用户的原因"""
+
+
+class QualityGate:
+    """
+    照片质量检查
+
+    Args:
+        min_sharpness: 拉普拉斯方差的下限，低于该值认为模糊
+        min_brightness / max_brightness: 平均亮度范围
+        min_contrast: 亮度标准差的下限，低于该值认为画面空白
+        stale_diff: 与上一张照片的平均像素差低于该值时认为是同一张照片
+        width: 检查时把照片缩小到的宽度
+    """
+
+    def __init__(
+        self,
+        min_sharpness: float = 40.0,
+        min_brightness: float = 40.0,
+        max_brightness: float = 220.0,
+        min_contrast: float = 10.0,
+        stale_diff: float = 1.0,
+        width: int = 256,
+    ):
+        self.min_sharpness = min_sharpness
+        self.min_brightness = min_brightness
+        self.max_brightness = max_brightness
+        self.min_contrast = min_contrast
+        self.stale_diff = stale_diff
+        self.width = width
+        self._previous: np.ndarray | None = None
+
+    def reset(self):
+        """开始新一轮扫描时清空上一张照片"""
+        self._previous = None
+
+    def measure(self, image: np.ndarray) -> dict:
+        """计算清晰度、亮度和对比度"""
+        return self._measure(self._thumbnail(image))
+
+    @staticmethod
+    def _measure(gray: np.ndarray) -> dict:
+        return {
+            "sharpness": float(cv2.Laplacian(gray, cv2.CV_32F).var()),
+            "brightness": float(gray.mean()),
+            "contrast": float(gray.std()),
+        }
+
+    def _thumbnail(self, image: np.ndarray) -> np.ndarray:
+        scale = min(self.width / image.shape[1], 1.0)
+        small = cv2.resize(
+            image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+        )
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def check(self, image: np.ndarray):
+        """
+        检查照片，不可用时抛出 ImageQualityError
+
+        每张照片都会被记住，用于判断下一张照片是否没有更新
+        """
+        gray = self._thumbnail(image)
+
+        previous, self._previous = self._previous, gray
+        if previous is not None and previous.shape == gray.shape:
+            diff = cv2.absdiff(previous, gray).mean()
+            if diff < self.stale_diff:
+                raise ImageQualityError("照片和上一张一样，可能还没有拍好")
+
+        metrics = self._measure(gray)
+        if metrics["brightness"] < self.min_brightness:
+            raise ImageQualityError("画面太暗了，请到亮一点的地方")
+        if metrics["brightness"] > self.max_brightness:
+            raise ImageQualityError("画面太亮了，请避开强光")
+        if metrics["contrast"] < self.min_contrast:
+            raise ImageQualityError("画面是空白的，请检查镜头是否被挡住")
+        if metrics["sharpness"] < self.min_sharpness:
+            raise ImageQualityError("照片有点模糊，请拿稳一点")
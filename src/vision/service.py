@@ -0,0 +1,159 @@
+"""
+预测服务
+
+多个线程 (多个会话或并行处理多个面) 共用一个模型时，把请求放入队列，
+由后台线程攒成小批量 (最多 max_batch 张，或等待 max_wait 秒) 后做一次推理，
+再把结果分发到各请求的 Future。ChatService 通过它做魔方检测，
+同一进程中的多个会话传入同一个实例即可共享模型 (见 vision.image.find_cube_contour)。
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Union
+
+import numpy as np
+
+from vision.predict import YOLOv11Predictor
+
+
+class PredictorService:
+    """
+    批量预测服务
+
+    Args:
+        max_batch: 每批最多的图片数
+        max_wait: 收到第一个请求后最多等待多少秒凑批
+        conf_threshold / iou_threshold: 同 YOLOv11Predictor.predict
+    """
+
+    def __init__(
+        self,
+        max_batch: int = 8,
+        max_wait: float = 0.01,
+        conf_threshold: float = 0.5,
+        iou_threshold: float = 0.5,
+    ):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._latencies: deque[float] = deque(maxlen=1000)  # 最近请求的耗时 (秒)
+        self._requests = 0
+        self._batches = 0
+
+    def start(self) -> "PredictorService":
+        """加载模型并启动后台推理线程"""
+        with self._start_lock:
+            if self._thread is None:
+                YOLOv11Predictor.warmup()
+                self._thread = threading.Thread(
+                    target=self._run, name="predictor-service", daemon=True
+                )
+                self._thread.start()
+        return self
+
+    def stop(self):
+        """处理完已提交的请求后停止"""
+        with self._start_lock:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+
+    def submit(self, source: Union[str, np.ndarray]) -> Future:
+        """
+        提交预测请求
+
+        Returns:
+            Future，结果格式同 YOLOv11Predictor.predict
+        """
+        if self._thread is None:
+            self.start()
+        future: Future = Future()
+        self._queue.put((source, future, time.perf_counter()))
+        return future
+
+    def predict(self, source: Union[str, np.ndarray], timeout: float | None = None):
+        """提交请求并等待结果"""
+        return self.submit(source).result(timeout)
+
+    def metrics(self) -> dict:
+        """队列长度、批大小和请求耗时 (毫秒)"""
+        with self._metrics_lock:
+            latencies = np.array(self._latencies) * 1000
+            p50, p95 = np.percentile(latencies, [50, 95]) if len(latencies) else (0, 0)
+            return {
+                "queue_depth": self._queue.qsize(),
+                "requests": self._requests,
+                "batches": self._batches,
+                "avg_batch_size": self._requests / max(self._batches, 1),
+                "latency_p50": float(p50),
+                "latency_p95": float(p95),
+            }
+
+    def _next_batch(self) -> list | None:
+        """取出一批请求，收到停止信号时返回 None"""
+        item = self._queue.get()
+        if item is None:
+            return None
+        batch = [item]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # 先处理完这一批，再退出
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            # 调用方已取消的请求不再推理
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if batch:
+                self._process(batch)
+
+    def _process(self, batch: list):
+        """推理一批请求，无论成功与否，每个 Future 都会得到结果或异常"""
+        try:
+            detections = YOLOv11Predictor.predict_batch(
+                [source for source, _, _ in batch],
+                conf_threshold=self.conf_threshold,
+                iou_threshold=self.iou_threshold,
+                batch_size=self.max_batch,
+            )
+            if len(detections) != len(batch):
+                raise RuntimeError(
+                    f"检测结果数 ({len(detections)}) 与请求数 ({len(batch)}) 不一致"
+                )
+
+            now = time.perf_counter()
+            with self._metrics_lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._latencies.extend(now - submitted for _, _, submitted in batch)
+            for (_, future, _), result in zip(batch, detections, strict=True):
+                future.set_result(result)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
@@ -0,0 +1,121 @@
+"""
+视频流识别
+
+从视频文件或摄像头 (cv2.VideoCapture) 连续读取画面，每隔 stride 帧识别一次，
+在滑动窗口内对每个色块的颜色投票，投票稳定后输出该面的颜色。
+用户只需依次转动魔方，不用逐个面拍照，运动模糊的帧也会被投票过滤掉。
+"""
+
+import sys
+from collections import Counter, deque
+from typing import Iterator, Union
+
+import cv2
+
+from cube.typing import Color
+from vision.image import get_cube_colors, perspective_correct
+from vision.tracker import CubeTracker
+
+
+class FaceVoter:
+    """
+    色块颜色的滑动窗口投票
+
+    Args:
+        window: 参与投票的最近识别结果数
+        min_votes: 每个色块的多数颜色至少获得的票数
+    """
+
+    def __init__(self, window: int = 8, min_votes: int = 6):
+        self.min_votes = min_votes
+        self.results: deque[str] = deque(maxlen=window)
+
+    def add(self, colors: str):
+        self.results.append(colors)
+
+    def clear(self):
+        self.results.clear()
+
+    def result(self) -> str | None:
+        """所有色块的投票都稳定时返回颜色字符串，否则返回 None"""
+        if len(self.results) < self.min_votes:
+            return None
+        colors = []
+        for idx in range(9):
+            color, votes = Counter(r[idx] for r in self.results).most_common(1)[0]
+            if color == "X" or votes < self.min_votes:
+                return None
+            colors.append(color)
+        return "".join(colors)
+
+
+def stream_faces(
+    source: Union[int, str] = 0,
+    stride: int = 3,
+    window: int = 8,
+    min_votes: int = 6,
+) -> Iterator[str]:
+    """
+    从视频流中识别魔方各面
+
+    Args:
+        source: 摄像头编号或视频文件路径，同 cv2.VideoCapture
+        stride: 每隔多少帧识别一次
+        window / min_votes: 投票参数，见 FaceVoter
+
+    Yields:
+        每个稳定识别到的面的颜色字符串，与上一个面相同时不重复输出
+    """
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        print(f"❌ 无法打开视频源: {source}")
+        return
+
+    tracker = CubeTracker()
+    voter = FaceVoter(window, min_votes)
+    last = None
+    index = -1
+    try:
+        while True:
+            # 跳过的帧只 grab 不解码
+            if not capture.grab():
+                break
+            index += 1
+            if index % stride:
+                continue
+            ok, frame = capture.retrieve()
+            if not ok:
+                break
+
+            contour = tracker.find_contour(frame)
+            if contour is None:
+                voter.clear()
+                continue
+            voter.add(get_cube_colors(perspective_correct(frame, contour)))
+
+            colors = voter.result()
+            if colors and colors != last:
+                last = colors
+                voter.clear()
+                yield colors
+    finally:
+        capture.release()
+
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else 0
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+
+    for count, colors in enumerate(stream_faces(source), 1):
+        print(f"✅ 第 {count} 个面:", colors)
+        for i in range(3):
+            for j in range(3):
+                print(Color.to_chinese(colors[i * 3 + j]), end=" ")
+            print()
+        if count == 6:
+            break
+
+
+if __name__ == "__main__":
+    main()
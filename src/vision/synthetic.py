@@ -0,0 +1,279 @@
+"""
+合成魔方照片
+
+用 NumPy/OpenCV 渲染随机打乱的魔方面：随机透视、光照、模糊和背景，
+同时给出色块颜色和魔方角点，用于离线评测识别流程，不依赖真实照片。
+也可以用进程池批量生成 YOLO 格式的训练集 (见 write_dataset)，用法:
+
+    python -m vision.synthetic --count 10000 --output data/yolo/synthetic
+
+局限：只渲染一个正对镜头的平面魔方面再做透视变换，没有三维的魔方（看不到侧面、
+没有立体阴影和手），与真实照片有差距，适合评测和预训练，不能代替真实照片的标注。
+
+640x480 的图片每张约 35-100ms (含 JPEG 编码，取决于 CPU)，单核约 600-1,600 张/分钟。
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from cube import Cube
+
+# 各颜色的 BGR 值
+STICKER_BGR = {
+    "W": (235, 235, 235),
+    "Y": (40, 215, 245),
+    "O": (20, 120, 250),
+    "R": (40, 30, 200),
+    "G": (80, 170, 30),
+    "B": (170, 80, 20),
+}
+
+# 打乱使用的外层转动
+SCRAMBLE_MOVES = [face + suffix for face in "UDFBLR" for suffix in ("", "'", "2")]
+
+
+def random_state(rng: np.random.Generator, moves: int = 25) -> str:
+    """随机打乱，返回 54 字符的魔方状态"""
+    cube = Cube()
+    cube.moves(" ".join(rng.choice(SCRAMBLE_MOVES, size=moves)))
+    return str(cube)
+
+
+def random_face(rng: np.random.Generator) -> str:
+    """从随机打乱的魔方中取一个面的 9 个颜色"""
+    face = int(rng.integers(6))
+    return random_state(rng)[face * 9 : face * 9 + 9]
+
+
+def render_face(colors: str, rng: np.random.Generator, size: int = 300) -> np.ndarray:
+    """渲染正对镜头的魔方面：黑色底座上 3x3 个带圆角的色块"""
+    face = np.full((size, size, 3), 20, dtype=np.uint8)
+    cell = size / 3
+    gap = int(cell * rng.uniform(0.04, 0.1))
+    radius = int(cell * rng.uniform(0.05, 0.2))
+    for idx, color in enumerate(colors):
+        row, col = divmod(idx, 3)
+        jitter = rng.normal(0, 8, 3)
+        bgr = tuple(
+            int(c) for c in np.clip(np.array(STICKER_BGR[color]) + jitter, 0, 255)
+        )
+        x1, y1 = int(col * cell) + gap, int(row * cell) + gap
+        x2, y2 = int((col + 1) * cell) - gap, int((row + 1) * cell) - gap
+        # 圆角矩形：两个矩形加四个圆
+        cv2.rectangle(face, (x1 + radius, y1), (x2 - radius, y2), bgr, -1)
+        cv2.rectangle(face, (x1, y1 + radius), (x2, y2 - radius), bgr, -1)
+        for cx, cy in ((x1, y1), (x2, y1), (x1, y2), (x2, y2)):
+            cx += radius if cx == x1 else -radius
+            cy += radius if cy == y1 else -radius
+            cv2.circle(face, (cx, cy), radius, bgr, -1)
+    return face
+
+
+def random_background(rng: np.random.Generator, width: int, height: int) -> np.ndarray:
+    """随机背景：渐变底色加噪声块"""
+    top = rng.integers(0, 256, 3).astype(np.float32)
+    bottom = rng.integers(0, 256, 3).astype(np.float32)
+    t = np.linspace(0, 1, height, dtype=np.float32)[:, None, None]
+    gradient = top * (1 - t) + bottom * t  # (height, 1, 3)，按行广播，不生成整幅底色
+    noise = rng.standard_normal((height // 16 + 1, width // 16 + 1, 3), np.float32)
+    noise = cv2.resize(noise, (width, height))[:height, :width]
+    background = noise * np.float32(rng.uniform(5, 40)) + gradient
+    return np.clip(background, 0, 255).astype(np.uint8)
+
+
+def random_quad(rng: np.random.Generator, width: int, height: int) -> np.ndarray:
+    """随机的魔方面四边形：随机大小、位置、旋转和透视"""
+    side = rng.uniform(0.25, 0.6) * min(width, height)
+    cx = rng.uniform(side * 0.6, width - side * 0.6)
+    cy = rng.uniform(side * 0.6, height - side * 0.6)
+    angle = rng.uniform(-0.25, 0.25)
+    square = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]], dtype=np.float32) * side / 2
+    rotation = np.array(
+        [[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]],
+        dtype=np.float32,
+    )
+    quad = square @ rotation.T + (cx, cy)
+    quad += rng.normal(0, side * 0.04, quad.shape)  # 透视变形
+    return quad.astype(np.float32)
+
+
+def apply_lighting(image: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """随机曝光、色温、光照渐变、模糊和噪声"""
+    height, width = image.shape[:2]
+    # 曝光和色温合并为每个通道一个系数
+    gain = (rng.uniform(0.6, 1.3) * rng.uniform(0.9, 1.1, 3)).astype(np.float32)
+    # 一侧亮一侧暗，行、列两个方向分别计算再广播相加
+    direction = rng.normal(size=2)
+    direction /= np.linalg.norm(direction) + 1e-6
+    strength = rng.uniform(0, 0.5)
+    xs = (np.arange(width, dtype=np.float32) / width - 0.5) * direction[0]
+    ys = (np.arange(height, dtype=np.float32) / height - 0.5) * direction[1]
+    ramp = 1 + (ys[:, None] + xs[None, :]) * np.float32(strength)
+    result = image.astype(np.float32)
+    result *= ramp[:, :, None]
+    result *= gain
+    if rng.random() < 0.5:
+        k = int(rng.choice([3, 5, 7]))
+        result = cv2.GaussianBlur(result, (k, k), 0)
+    # 逐像素的高斯噪声用 OpenCV 生成，比 NumPy 快约 3 倍，种子取自 rng 以保证可复现
+    noise = np.empty_like(result)
+    cv2.setRNGSeed(int(rng.integers(2**31)))
+    cv2.randn(noise, 0, rng.uniform(1, 6))
+    result += noise
+    return np.clip(result, 0, 255).astype(np.uint8)
+
+
+def render_photo(
+    rng: np.random.Generator,
+    colors: str | None = None,
+    width: int = 640,
+    height: int = 480,
+) -> tuple[np.ndarray, str, np.ndarray]:
+    """
+    渲染一张合成照片
+
+    Returns:
+        (BGR 图像, 9 个色块颜色, 魔方角点 shape=(4, 2)，顺序为左上、右上、右下、左下)
+    """
+    colors = colors or random_face(rng)
+    face = render_face(colors, rng)
+    size = face.shape[0]
+    quad = random_quad(rng, width, height)
+
+    src = np.array([[0, 0], [size, 0], [size, size], [0, size]], dtype=np.float32)
+    M = cv2.getPerspectiveTransform(src, quad)
+    warped = cv2.warpPerspective(face, M, (width, height))
+    mask = cv2.warpPerspective(np.full((size, size), 255, np.uint8), M, (width, height))
+
+    image = random_background(rng, width, height)
+    image[mask > 0] = warped[mask > 0]
+    return apply_lighting(image, rng), colors, quad
+
+
+def generate(count: int, seed: int = 0, width: int = 640, height: int = 480):
+    """逐张生成合成照片，参数与返回值同 render_photo"""
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        yield render_photo(rng, width=width, height=height)
+
+
+def yolo_label(quad: np.ndarray, width: int, height: int, class_id: int = 0) -> str:
+    """魔方角点转换为 YOLO 标注: class cx cy w h (归一化到 0-1)"""
+    x1, y1 = np.clip(quad.min(axis=0), 0, (width, height))
+    x2, y2 = np.clip(quad.max(axis=0), 0, (width, height))
+    return (
+        f"{class_id} {(x1 + x2) / 2 / width:.6f} {(y1 + y2) / 2 / height:.6f} "
+        f"{(x2 - x1) / width:.6f} {(y2 - y1) / height:.6f}"
+    )
+
+
+def _write_chunk(output: str, split: str, start: int, count: int, seed: int, size):
+    """在工作进程中生成一批图片，按序号命名，随机种子由 (seed, split, start) 决定"""
+    width, height = size
+    rng = np.random.default_rng([seed, split == "val", start])
+    for idx in range(start, start + count):
+        image, _, quad = render_photo(rng, width=width, height=height)
+        name = f"{split}_{idx:07d}"
+        cv2.imwrite(os.path.join(output, "images", split, f"{name}.jpg"), image)
+        with open(os.path.join(output, "labels", split, f"{name}.txt"), "w") as f:
+            f.write(yolo_label(quad, width, height) + "\n")
+    return count
+
+
+def write_dataset(
+    output: str = "data/yolo/synthetic",
+    count: int = 10000,
+    val_ratio: float = 0.1,
+    workers: int | None = None,
+    seed: int = 0,
+    width: int = 640,
+    height: int = 480,
+    chunk_size: int = 200,
+) -> str:
+    """
+    用进程池生成 YOLO 格式的训练集
+
+    YOLO 标准目录结构：images/{train,val}、labels/{train,val} 和 dataset.yaml，
+    只有一个类别 cube。相同的参数总是生成相同的数据集。
+
+    Returns:
+        dataset.yaml 的路径，可直接用于训练
+    """
+    splits = {"val": int(count * val_ratio)}
+    splits["train"] = count - splits["val"]
+    for split in splits:
+        os.makedirs(os.path.join(output, "images", split), exist_ok=True)
+        os.makedirs(os.path.join(output, "labels", split), exist_ok=True)
+
+    start_time = time.perf_counter()
+    done = 0
+    # 每个进程只用一个 OpenCV 线程，多个进程各自开线程池会争抢 CPU，反而更慢
+    with ProcessPoolExecutor(
+        workers or os.cpu_count() or 1,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=cv2.setNumThreads,
+        initargs=(1,),
+    ) as pool:
+        futures = [
+            pool.submit(
+                _write_chunk,
+                output,
+                split,
+                start,
+                min(chunk_size, total - start),
+                seed,
+                (width, height),
+            )
+            for split, total in splits.items()
+            for start in range(0, total, chunk_size)
+        ]
+        for future in futures:
+            done += future.result()
+
+    yaml_path = os.path.join(output, "dataset.yaml")
+    with open(yaml_path, "w", encoding="utf-8") as f:
+        f.write(
+            f"path: {os.path.abspath(output)}\n"
+            "train: images/train\n"
+            "val: images/val\n"
+            "names:\n"
+            "  0: cube\n"
+        )
+
+    elapsed = time.perf_counter() - start_time
+    print(
+        f"✅ 已生成 {done} 张图片，耗时 {elapsed:.1f}s ({done / elapsed * 60:.0f} 张/分钟)"
+    )
+    return yaml_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成魔方训练集")
+    parser.add_argument("--output", default="data/yolo/synthetic", help="输出目录")
+    parser.add_argument("--count", type=int, default=10000, help="图片总数")
+    parser.add_argument("--val-ratio", type=float, default=0.1, help="验证集比例")
+    parser.add_argument("--workers", type=int, help="工作进程数，默认为 CPU 核数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--width", type=int, default=640, help="图片宽度")
+    parser.add_argument("--height", type=int, default=480, help="图片高度")
+    args = parser.parse_args()
+
+    write_dataset(
+        args.output,
+        args.count,
+        args.val_ratio,
+        args.workers,
+        args.seed,
+        args.width,
+        args.height,
+    )
+
+
+if __name__ == "__main__":
+    main()
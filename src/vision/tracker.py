@@ -0,0 +1,61 @@
+"""
+魔方位置跟踪
+
+用户拍摄六个面时手机和魔方的位置基本不变，可以复用上一张照片的检测框：
+先在原位置做一次廉价的校验（每个格子颜色均匀，且能看到 3x3 网格），
+校验失败时才重新定位 (网格拟合或 YOLO 检测)。
+校验不依赖颜色阈值，整体聚类识别颜色时同样有效。
+"""
+
+import numpy as np
+
+from vision.grid import grid_score
+from vision.image import find_cube_contour, get_cell_pixels, perspective_correct
+
+
+class CubeTracker:
+    """
+    跟踪魔方在照片中的位置
+
+    Args:
+        max_spread: 格子内 S/V 通道标准差的上限，超过说明格子里混进了其他颜色或背景
+        min_grid: 网格分数的下限 (见 vision.grid.grid_score)，低于它说明原位置已经不是魔方面
+    """
+
+    def __init__(self, max_spread: float = 30.0, min_grid: float = 8.0):
+        self.max_spread = max_spread
+        self.min_grid = min_grid
+        self.contour: np.ndarray | None = None
+        self.hits = 0  # 复用检测框的次数
+        self.misses = 0  # 重新检测的次数
+
+    def reset(self):
+        """开始新一轮扫描时清空跟踪状态"""
+        self.contour = None
+
+    def verify(self, image: np.ndarray, contour: np.ndarray) -> bool:
+        """检查轮廓内是否仍是对齐的 3x3 色块"""
+        corrected = perspective_correct(image, contour)
+        if min(corrected.shape[:2]) < 9:
+            return False
+
+        pixels = get_cell_pixels(corrected).astype(np.float32)
+        # 色相在红色处首尾相接，只用饱和度和明度判断格子是否均匀
+        spread = pixels[:, :, 1:].std(axis=1)
+        if (spread > self.max_spread).any():
+            return False
+        return grid_score(corrected) >= self.min_grid
+
+    def find_contour(self, image: np.ndarray, service=None):
+        """
+        定位魔方轮廓，格式同 find_cube_contour
+
+        上一张照片的位置校验通过时直接复用，否则重新检测 (service 见 find_cube_contour)
+        """
+        if self.contour is not None and self.verify(image, self.contour):
+            self.hits += 1
+            return self.contour
+
+        self.misses += 1
+        self.contour = find_cube_contour(image, service=service)
+        return self.contour
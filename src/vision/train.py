@@ -1,32 +1,85 @@
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+import pandas as pd
 import torch
 from ultralytics import YOLO
 
+PROJECT = "data/yolo"
+DATASET = "data/yolo/dataset/dataset.yaml"
 
-def train_yolo_model():
-    """训练YOLO模型"""
 
-    # 检查设备
+def _device():
+    """检查设备"""
     if torch.backends.mps.is_available():
-        device = "mps"
         print("使用 macOS MPS 后端进行训练")
-    else:
-        device = "cpu"
-        print("MPS 不可用，使用 CPU 进行训练")
+        return "mps"
+    if torch.cuda.is_available():
+        print("使用 CUDA 进行训练")
+        return "cuda"
+    print("使用 CPU 进行训练")
+    return "cpu"
+
+
+def train_yolo_model(
+    model: str = "yolo11m.pt",
+    data: str = DATASET,
+    imgsz: int = 640,
+    epochs: int = 100,
+    batch: int = 32,
+    cache: str | bool = "ram",
+    name: str | None = None,
+    resume: bool = False,
+    device: str | None = None,
+):
+    """
+    训练YOLO模型
+
+    Args:
+        model: 预训练模型，如 yolo11n.pt / yolo11s.pt / yolo11m.pt
+        data: 数据集配置，可以用 vision.synthetic 生成
+        imgsz: 输入尺寸，CPU 上推理耗时大致与 imgsz² 成正比
+        cache: 数据集缓存，ram 缓存解码后的图片，disk 缓存为 .npy，False 不缓存
+        name: 训练结果目录 data/yolo/<name>，默认由模型和输入尺寸组成，如 yolo11m-640
+        resume: 已有未完成的训练 (data/yolo/<name>/weights/last.pt) 时继续训练。
+                默认不继续：继续训练时沿用上次的参数，会忽略本次传入的模型和输入尺寸
+        device: 训练设备，默认自动选择
+    """
+    device = device or _device()
+    name = name or f"{os.path.splitext(os.path.basename(model))[0]}-{imgsz}"
+
+    last = os.path.join(PROJECT, name, "weights", "last.pt")
+    if resume and os.path.exists(last):
+        print(f"继续训练: {last}")
+        yolo = YOLO(last)
+        try:
+            results = yolo.train(resume=True)
+        except AssertionError:
+            # ultralytics 在训练已完成时拒绝 resume
+            print("训练已完成，跳过")
+            results = None
+        return yolo, results
 
     # 加载模型
-    print("加载YOLO模型...")
-    model = YOLO("yolo11m.pt")
+    print(f"加载YOLO模型 {model}...")
+    yolo = YOLO(model)
 
     # 训练参数
     train_args = {
-        "project": "data/yolo",
-        "data": "data/yolo/dataset/dataset.yaml",
-        "epochs": 100,
-        "batch": 32,
+        "project": PROJECT,
+        "name": name,
+        "data": data,
+        "epochs": epochs,
+        "batch": batch,
         "patience": 5,
-        "imgsz": 640,
+        "imgsz": imgsz,
+        "cache": cache,
         "device": device,
-        "workers": 0 if device == "mps" else 4,  # MPS下workers设为0
+        # MPS下workers设为0
+        "workers": 0 if device == "mps" else min(8, os.cpu_count() or 1),
         "save": True,
         "exist_ok": True,
         "verbose": True,
@@ -34,13 +87,112 @@ def train_yolo_model():
 
     # 开始训练
     print("开始训练模型...")
-    results = model.train(**train_args)
+    results = yolo.train(**train_args)
 
     print("训练完成!")
-    print("最佳模型保存在: data/yolo/train/weights/best.pt")
+    print(f"最佳模型保存在: {PROJECT}/{name}/weights/best.pt")
+
+    return yolo, results
+
+
+def cpu_latency(weights: str, imgsz: int, images: list[str], runs: int = 20) -> float:
+    """CPU 单张推理耗时 (毫秒，中位数)"""
+    yolo = YOLO(weights)
+    sources = images[:runs] or [np.zeros((imgsz, imgsz, 3), dtype=np.uint8)] * runs
+    yolo.predict(sources[0], imgsz=imgsz, device="cpu", verbose=False)  # 预热
+    times = []
+    for source in sources:
+        start = time.perf_counter()
+        yolo.predict(source, imgsz=imgsz, device="cpu", verbose=False)
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times))
+
+
+def sweep(
+    models=("n", "s", "m"),
+    sizes=(320, 480, 640),
+    data: str = DATASET,
+    epochs: int = 100,
+    report: str = "data/yolo/sweep.csv",
+):
+    """
+    对比不同大小的模型和输入尺寸
+
+    每个组合训练到 data/yolo/<model>-<imgsz>，已训练完的组合直接复用，
+    中断后重新运行会继续未完成的训练。最后在验证集上评估 mAP，
+    并测量 CPU 推理耗时，结果保存为 CSV。
+    """
+    val_images = sorted(
+        glob.glob(os.path.join(os.path.dirname(data), "images", "val", "*.jpg"))
+    )
+    rows = []
+    for size in models:
+        for imgsz in sizes:
+            name = f"{size}-{imgsz}"
+            train_yolo_model(
+                model=f"yolo11{size}.pt",
+                data=data,
+                imgsz=imgsz,
+                epochs=epochs,
+                name=name,
+                resume=True,
+            )
+            weights = os.path.join(PROJECT, name, "weights", "best.pt")
+            metrics = YOLO(weights).val(data=data, imgsz=imgsz, verbose=False)
+            rows.append(
+                {
+                    "model": f"yolo11{size}",
+                    "imgsz": imgsz,
+                    "mAP50": metrics.box.map50,
+                    "mAP50-95": metrics.box.map,
+                    "cpu_ms": cpu_latency(weights, imgsz, val_images),
+                    "weights": weights,
+                }
+            )
+
+    df = pd.DataFrame(rows).sort_values("cpu_ms")
+    df.to_csv(report, index=False)
+    print(df.to_string(index=False))
+    print(f"✅ 对比结果已保存到 {report}")
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="训练魔方检测模型")
+    parser.add_argument("--model", default="yolo11m.pt", help="预训练模型")
+    parser.add_argument("--data", default=DATASET, help="数据集配置")
+    parser.add_argument("--imgsz", type=int, default=640, help="输入尺寸")
+    parser.add_argument("--epochs", type=int, default=100, help="训练轮数")
+    parser.add_argument("--batch", type=int, default=32, help="批大小")
+    parser.add_argument(
+        "--cache", default="ram", choices=["ram", "disk", "none"], help="数据集缓存"
+    )
+    parser.add_argument(
+        "--name", help="训练结果目录名，默认由模型和输入尺寸组成，如 yolo11m-640"
+    )
+    parser.add_argument(
+        "--resume", action="store_true", help="继续同名目录中未完成的训练"
+    )
+    parser.add_argument(
+        "--sweep", action="store_true", help="对比 n/s/m 模型和多种输入尺寸"
+    )
+    args = parser.parse_args()
+
+    if args.sweep:
+        sweep(data=args.data, epochs=args.epochs)
+        return
 
-    return model, results
+    train_yolo_model(
+        model=args.model,
+        data=args.data,
+        imgsz=args.imgsz,
+        epochs=args.epochs,
+        batch=args.batch,
+        cache=False if args.cache == "none" else args.cache,
+        name=args.name,
+        resume=args.resume,
+    )
 
 
 if __name__ == "__main__":
-    train_yolo_model()
+    main()
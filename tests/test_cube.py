@@ -2,8 +2,19 @@
 魔方核心功能测试
 """
 
-from cube import Cube
+import time
+
+from cube import Cube, solve_many
+from cube.cache import SolutionCache
 from cube.cube import INITIAL_CUBE_STR
+from cube.kociemba import kociemba_solutions, kociemba_solve
+from cube.typing import Move
+
+
+def _hang_on_long_solution(solution: str):
+    """模拟卡住的求解进程：找到较长的解时不再返回"""
+    if sum(face in "URFDLB" for face in solution) > 3:
+        time.sleep(60)
 
 
 class TestCube:
@@ -59,3 +70,195 @@ class TestCube:
         solution = cube.solve(method="kociemba")
         print(cube.is_solved(), len(solution.ops.split(" ")))
         assert cube.is_solved(), "魔方应该已经解决"
+
+    def test_kociemba_solutions_stream(self):
+        """测试逐步返回更短的解法"""
+        cube = Cube()
+        cube.scramble(ops="U R F D L B")
+        state = str(cube)
+
+        solutions = list(kociemba_solutions(state, timeout=0.5, target_length=0))
+        assert solutions, "至少应该找到一个解"
+        lengths = [len(Move.from_core(s).split(" ")) for s in solutions]
+        assert lengths == sorted(lengths, reverse=True), "解法应该越来越短"
+        for moves in solutions:
+            cube = Cube(state)
+            cube.moves(moves)
+            assert cube.is_solved(), "每个解法都应该能还原魔方"
+
+    def test_solve_kociemba_timeout(self):
+        """测试步数限制无法满足时按时停止搜索并退回 CFOP"""
+        cube = Cube()
+        cube.moves("R U F' D2 L B'")
+        state = str(cube)
+
+        start = time.monotonic()
+        assert kociemba_solve(state, max_length=3, timeout=0.2) is None
+        assert time.monotonic() - start < 2, "没有找到解时也应该按时停止"
+
+        solution = cube.solve(method="kociemba", max_length=3, timeout=0.2)
+        assert cube.is_solved(), "魔方应该已经解决"
+        assert solution.cross, "应该退回 CFOP 求解"
+
+    def test_solve_kociemba_short_budget(self):
+        """测试时间预算很短时仍然返回第一个解，不退回 CFOP"""
+        for _ in range(10):
+            cube = Cube()
+            cube.scramble(ops="U R F D L B U' R' F' D' L' B'")
+            solution = cube.solve(method="kociemba", timeout=0.001)
+            assert cube.is_solved(), "魔方应该已经解决"
+            assert not solution.cross, "不限步数时应该等到 Kociemba 的第一个解"
+
+    def test_solve_kociemba_parallel(self):
+        """测试多进程求解魔方"""
+        cube = Cube()
+        cube.scramble(ops="U R F D L B")
+        solution = cube.solve(method="kociemba", parallel=True)
+        print(cube.is_solved(), len(solution.ops.split(" ")))
+        assert cube.is_solved(), "魔方应该已经解决"
+
+    def test_solve_kociemba_parallel_worker_died(self):
+        """测试搜索进程退出时关闭进程池并改用线程搜索，不会一直等待"""
+        from cube.kociemba import start_search_pool
+
+        pool = start_search_pool()
+        pool._processes[0].kill()
+        pool._processes[0].join()
+
+        cube = Cube()
+        cube.moves("R U F' D2 L B'")
+        start = time.monotonic()
+        solution = cube.solve(method="kociemba", parallel=True, timeout=0.5)
+        assert time.monotonic() - start < 5, "搜索进程退出后不应该一直等待"
+        assert cube.is_solved(), "魔方应该已经解决"
+        assert not solution.cross, "应该改用线程搜索，而不是退回 CFOP"
+        assert start_search_pool() is not pool, "有进程退出的进程池应该被替换"
+
+    def test_solve_kociemba_any_orientation(self):
+        """测试中心块不在标准位置时也使用 Kociemba 求解"""
+        cube = Cube()
+        cube.scramble()  # 包含整体转动和中间层转动
+        solution = cube.solve(method="kociemba")
+        print(cube.is_solved(), len(solution.ops.split(" ")))
+        assert cube.is_solved(), "魔方应该已经解决"
+        assert not solution.cross, "应该使用 Kociemba 而不是 CFOP 求解"
+
+    def test_solve_with_cache(self, tmp_path):
+        """测试求解结果缓存"""
+        cache = SolutionCache(path=str(tmp_path / "solutions.db"), max_memory=1)
+        assert not (tmp_path / "solutions.db").exists(), "第一次写入前不应创建缓存文件"
+        cube = Cube()
+        cube.scramble(ops="U R F D L B")
+        state = str(cube)
+        cube.solve(cache=cache)
+        assert cube.is_solved(), "魔方应该已经解决"
+
+        # 搜索要求更严格时，不使用较快搜索得到的解法
+        assert cache.get(state, target_length=10, timeout=5.0) is None
+        assert cache.get(state, max_length=5) is None
+
+        # 同一个打乱换个朝向拿在手里，也应该命中缓存
+        cube = Cube(state)
+        cube.moves("x y'")
+        cube.solve(cache=cache)
+        assert cube.is_solved(), "缓存的解法应该能还原魔方"
+        assert cache.stats()["hits"] == 1
+
+        # 内存缓存被淘汰后，仍然可以从磁盘命中
+        other = Cube()
+        other.scramble(moves_count=10, ops="U R F D L B")
+        other.solve(cache=cache)
+        cube = Cube(state)
+        cube.solve(cache=cache)
+        assert cube.is_solved(), "磁盘缓存的解法应该能还原魔方"
+        assert cache.stats()["hits"] == 2
+
+    def test_solve_many(self):
+        """测试批量求解"""
+        states = []
+        for _ in range(3):
+            cube = Cube()
+            cube.scramble()
+            states.append(str(cube))
+
+        results = list(solve_many(states, workers=2, ordered=True))
+        assert [index for index, _ in results] == [0, 1, 2], "应该按输入顺序返回"
+        for index, solution in results:
+            cube = Cube(states[index])
+            cube.moves(solution.ops)
+            assert cube.is_solved(), "魔方应该已经解决"
+
+    def test_solve_many_timeout(self):
+        """测试批量求解时限：卡住的进程被结束，后面的状态从分配给进程时开始计时"""
+        states = []
+        for scramble in ["R U F' D2 L B'", "U", "U2", "F'"]:
+            cube = Cube()
+            cube.moves(scramble)
+            states.append(str(cube))
+
+        start = time.monotonic()
+        results = dict(
+            solve_many(
+                states,
+                workers=1,
+                ordered=True,
+                timeout=1.0,
+                on_solution=_hang_on_long_solution,
+            )
+        )
+        elapsed = time.monotonic() - start
+
+        assert isinstance(results[0], TimeoutError), "卡住的状态应该超时"
+        for index in (1, 2, 3):
+            cube = Cube(states[index])
+            cube.moves(results[index].ops)
+            assert cube.is_solved(), f"第 {index} 个魔方应该在新进程中解决"
+        assert elapsed < 10, f"卡住的进程应该被结束，实际耗时 {elapsed:.1f}s"
+
+    def test_solve_many_optimal_timeout(self):
+        """测试批量求最优解时使用批量时限，超出预算时返回 Kociemba 的解而不是超时"""
+        cube = Cube()
+        cube.moves("R U F' D2 L B' U2 R' F L2 D B2 R U' F2")
+        state = str(cube)
+
+        [(_, solution)] = solve_many([state], method="optimal", workers=1, timeout=0.5)
+        assert not isinstance(solution, Exception), f"不应该求解失败: {solution!r}"
+        cube = Cube(state)
+        cube.moves(solution.ops)
+        assert cube.is_solved(), "魔方应该已经解决"
+
+    def test_solve_optimal(self):
+        """测试最优解求解（缺少数据表时退回 Kociemba）"""
+        cube = Cube()
+        cube.moves("R U F' D2 L B'")
+        solution = cube.solve(method="optimal")
+        print(cube.is_solved(), solution.ops)
+        assert cube.is_solved(), "魔方应该已经解决"
+
+    def test_optimal_length(self, tmp_path):
+        """测试 IDA* 求出的解法步数最少（使用只搜索到第 5 层的小数据表）"""
+        from cube.optimal import build_tables, optimal_solve
+        from cube.typing import Solution
+
+        path = str(tmp_path / "optimal")
+        build_tables(path, max_depth=5)
+
+        # (打乱, 最少步数)，含可以抵消或合并的转动
+        scrambles = [
+            ("R", 1),
+            ("R L R'", 1),
+            ("R U R' U' U R", 2),
+            ("R U2 F' L", 4),
+            ("R U F' D2 L B'", 6),
+            ("R U F' D2 L B' U2", 7),
+        ]
+        for scramble, length in scrambles:
+            cube = Cube()
+            cube.moves(scramble)
+            moves = optimal_solve(str(cube), max_length=10, timeout=30, path=path)
+            assert moves is not None, f"{scramble} 应该在预算内求解"
+            cube.moves(Solution(align=moves, cross="", f2l="", oll="", pll="").ops)
+            assert cube.is_solved(), f"{scramble} 的解法 {moves} 应该能还原魔方"
+            assert sum(face in "URFDLB" for face in moves) == length, (
+                f"{scramble} 的最少步数应该是 {length}，实际 {moves}"
+            )
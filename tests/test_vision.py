@@ -0,0 +1,302 @@
+"""
+魔方识别测试
+
+测试环境不一定安装了 torch / ultralytics，导入 vision 模块之前用假的 vision.predict 代替，
+需要 YOLO 检测的地方由测试自己提供检测结果。
+"""
+
+import sys
+import threading
+import types
+
+import cv2
+import numpy as np
+import pytest
+
+
+class _FakePredictor:
+    """代替 YOLOv11Predictor，测试中不应该调用到它"""
+
+    backend = "torch"
+
+    @staticmethod
+    def predict(*args, **kwargs):
+        raise AssertionError("测试中不应该调用 YOLO 检测")
+
+    predict_batch = predict
+    warmup = predict
+
+
+sys.modules.setdefault(
+    "vision.predict", types.SimpleNamespace(YOLOv11Predictor=_FakePredictor)
+)
+
+from cube.orientation import rotate  # noqa: E402
+from vision import service as service_module  # noqa: E402
+from vision import synthetic  # noqa: E402
+from vision.cluster import cluster_colors  # noqa: E402
+from vision.corner import FLIP_ROTATION, compose_order, compose_state  # noqa: E402
+from vision.grid import find_grid_contour, fit_grid, grid_score  # noqa: E402
+from vision.image import (  # noqa: E402
+    choose_reduce,
+    get_cell_samples,
+    image_size,
+    match_colors,
+    perspective_correct,
+)
+from vision.quality import ImageQualityError, QualityGate  # noqa: E402
+from vision.service import PredictorService  # noqa: E402
+from vision.stream import FaceVoter  # noqa: E402
+
+
+def _to_hsv(bgr: np.ndarray) -> np.ndarray:
+    """BGR 颜色列表转换为 HSV，shape=(N, 3)"""
+    pixels = np.clip(bgr, 0, 255).astype(np.uint8)[None]
+    return cv2.cvtColor(pixels, cv2.COLOR_BGR2HSV)[0].astype(np.float32)
+
+
+def _corner_error(contour: np.ndarray, quad: np.ndarray) -> float:
+    """两个四边形对应角点的最大距离 (像素)，不考虑起始角点"""
+    return min(
+        float(np.linalg.norm(np.roll(contour, k, axis=0) - quad, axis=1).max())
+        for k in range(4)
+    )
+
+
+def _encode(width: int, height: int, ext: str = ".jpg") -> bytes:
+    """编码一张指定尺寸的图片"""
+    ok, data = cv2.imencode(ext, np.zeros((height, width, 3), dtype=np.uint8))
+    assert ok
+    return data.tobytes()
+
+
+class TestImage:
+    """图片读取测试"""
+
+    def test_image_size(self, tmp_path):
+        """测试只读文件头获取 JPEG / PNG 尺寸"""
+        assert image_size(_encode(640, 480)) == (640, 480)
+        assert image_size(_encode(300, 500, ".png")) == (300, 500)
+        path = tmp_path / "photo.jpg"
+        path.write_bytes(_encode(4032, 3024))
+        assert image_size(str(path)) == (4032, 3024)
+        assert image_size(b"not an image") is None
+        assert image_size(str(tmp_path / "missing.jpg")) is None
+
+    def test_choose_reduce(self):
+        """测试缩小解码后长边不小于 640"""
+        assert choose_reduce(_encode(640, 480)) == 1, "640x480 的照片不应该缩小"
+        assert choose_reduce(_encode(1280, 960)) == 2
+        assert choose_reduce(_encode(4032, 3024)) == 4
+        assert choose_reduce(_encode(8000, 6000)) == 8
+        assert choose_reduce(b"not an image") == 1, "读取不到尺寸时不应该缩小"
+        assert choose_reduce(np.zeros((4000, 3000, 3), dtype=np.uint8)) == 1
+
+    def test_cell_samples_non_square(self):
+        """测试宽高不相等的校正结果按各自的边长切分格子"""
+        colors = "WYROGBGRY"
+        bgr = np.array([synthetic.STICKER_BGR[c] for c in colors], dtype=np.float32)
+        for height, width in ((90, 210), (240, 96)):
+            face = np.zeros((height, width, 3), dtype=np.uint8)
+            cell_h, cell_w = height / 3, width / 3
+            for idx, color in enumerate(bgr):
+                row, col = divmod(idx, 3)
+                y1, y2 = int(row * cell_h), int((row + 1) * cell_h)
+                x1, x2 = int(col * cell_w), int((col + 1) * cell_w)
+                face[y1:y2, x1:x2] = color
+            samples = get_cell_samples(face)
+            assert samples.shape == (9, 3)
+            assert np.abs(samples - _to_hsv(bgr)).max() <= 1, f"{height}x{width}"
+            assert match_colors(samples) == colors
+
+
+class TestCluster:
+    """整体颜色聚类测试"""
+
+    def test_cluster_colors(self):
+        """测试偏暗的暖光下阈值匹配失败，整体聚类仍能识别"""
+        rng = np.random.default_rng(0)
+        for _ in range(20):
+            state = synthetic.random_state(rng)
+            bgr = np.array([synthetic.STICKER_BGR[c] for c in state], dtype=np.float32)
+            bgr = bgr * (0.42, 0.48, 0.6) + rng.normal(0, 4, bgr.shape)
+            samples = _to_hsv(bgr)
+            assert cluster_colors(samples) == state, "整体聚类应该识别出所有色块"
+        assert match_colors(samples) != state, "偏暗的暖光下阈值匹配应该出错"
+
+
+class TestCorner:
+    """斜角拍摄测试"""
+
+    def test_compose_order(self):
+        """测试两张斜角照片合并为完整状态"""
+        order = compose_order()
+        assert sorted(order) == list(range(54)), "每个色块应该恰好取一次"
+
+        rng = np.random.default_rng(0)
+        for _ in range(5):
+            state = synthetic.random_state(rng)
+            flipped = rotate(state, FLIP_ROTATION)
+            # 斜角照片按 F, R, U 面的顺序给出 27 个色块
+            first = state[0:9] + state[18:27] + state[27:36]
+            second = flipped[0:9] + flipped[18:27] + flipped[27:36]
+            assert compose_state(first, second) == state
+
+
+class TestFaceVoter:
+    """视频流投票测试"""
+
+    def test_face_voter(self):
+        """测试滑动窗口投票"""
+        voter = FaceVoter(window=5, min_votes=3)
+        voter.add("WWWWWWWWW")
+        voter.add("WWWWXWWWW")
+        assert voter.result() is None, "票数不足时不应该输出"
+        voter.add("WWWWRWWWW")
+        assert voter.result() is None, "中心块没有多数颜色时不应该输出"
+        voter.add("WWWWWWWWW")
+        voter.add("WWWWWWWWW")
+        assert voter.result() == "WWWWWWWWW", "每个色块的多数颜色达到票数时应该输出"
+
+        voter.clear()
+        for _ in range(3):
+            voter.add("WWWWXWWWW")
+        assert voter.result() is None, "多数颜色为 X 时不应该输出"
+
+
+class TestGrid:
+    """网格定位测试"""
+
+    def test_fit_grid(self):
+        """测试从色块拟合 3x3 网格，缺少的色块不影响结果"""
+        angle = 0.2
+        rotation = np.array(
+            [[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]],
+            dtype=np.float32,
+        )
+        center, pitch, side = np.array([320, 240], np.float32), 60, 50
+        unit = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]], np.float32) / 2
+        squares = [
+            (unit * side + np.array([col, row], np.float32) * pitch) @ rotation.T
+            + center
+            for row in (-1, 0, 1)
+            for col in (-1, 0, 1)
+        ]
+        expected = (unit * 3 * pitch) @ rotation.T + center
+
+        corners = fit_grid(squares)
+        assert corners is not None
+        assert _corner_error(corners, expected) < 1
+        corners = fit_grid(squares[1:-1])
+        assert corners is not None, "少两个色块时也应该拟合成功"
+        assert _corner_error(corners, expected) < 1
+        assert fit_grid(squares[:6]) is None, "色块太少时不应该拟合"
+
+    def test_find_grid_contour(self):
+        """测试在合成照片上定位魔方面，角点误差在几个像素以内"""
+        rng = np.random.default_rng(0)
+        found = 0
+        for _ in range(10):
+            image, _, quad = synthetic.render_photo(rng)
+            contour = find_grid_contour(image)
+            if contour is not None:
+                found += 1
+                assert _corner_error(contour, quad) < 4
+        assert found >= 8, f"合成照片应该大多能定位，实际 {found}/10"
+
+    def test_grid_score(self):
+        """测试魔方面的网格分数明显高于背景"""
+        rng = np.random.default_rng(0)
+        for _ in range(5):
+            image, _, quad = synthetic.render_photo(rng)
+            assert grid_score(perspective_correct(image, quad)) >= 20
+            background = synthetic.random_background(rng, 300, 300)
+            assert grid_score(background) < 8
+
+
+class TestQualityGate:
+    """照片质量检查测试"""
+
+    def test_quality_gate(self):
+        """测试正常照片通过，模糊、过暗、空白和重复的照片被拦下"""
+        rng = np.random.default_rng(0)
+        image, _, _ = synthetic.render_photo(rng)
+        gate = QualityGate()
+        gate.check(image)
+
+        with pytest.raises(ImageQualityError, match="上一张"):
+            gate.check(image.copy())
+        gate.reset()
+        gate.check(image)
+
+        cases = {
+            "太暗": (image * 0.1).astype(np.uint8),
+            "太亮": np.full_like(image, 250),
+            "空白": np.full_like(image, 128),
+            "模糊": cv2.GaussianBlur(image, (31, 31), 0),
+        }
+        for reason, bad in cases.items():
+            gate.reset()
+            with pytest.raises(ImageQualityError, match=reason):
+                gate.check(bad)
+
+
+class TestPredictorService:
+    """批量预测服务测试"""
+
+    def test_futures(self, monkeypatch):
+        """测试并发请求合并推理，每个 Future 得到自己的结果"""
+        batches = []
+
+        class Predictor:
+            @staticmethod
+            def warmup():
+                pass
+
+            @staticmethod
+            def predict_batch(sources, **kwargs):
+                batches.append(len(sources))
+                return [[{"source": source}] for source in sources]
+
+        monkeypatch.setattr(service_module, "YOLOv11Predictor", Predictor)
+        service = PredictorService(max_batch=4, max_wait=0.05).start()
+        try:
+            results = {}
+
+            def request(idx):
+                results[idx] = service.predict(f"image-{idx}", timeout=5)
+
+            threads = [threading.Thread(target=request, args=(i,)) for i in range(10)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            assert results == {i: [{"source": f"image-{i}"}] for i in range(10)}
+            assert max(batches) <= 4 and len(batches) < 10, "请求应该合并推理"
+            metrics = service.metrics()
+            assert metrics["requests"] == 10 and metrics["batches"] == len(batches)
+        finally:
+            service.stop()
+
+    def test_futures_error(self, monkeypatch):
+        """测试推理出错时同一批的每个 Future 都得到异常"""
+
+        class Predictor:
+            @staticmethod
+            def warmup():
+                pass
+
+            @staticmethod
+            def predict_batch(sources, **kwargs):
+                raise RuntimeError("推理失败")
+
+        monkeypatch.setattr(service_module, "YOLOv11Predictor", Predictor)
+        service = PredictorService(max_wait=0.05).start()
+        try:
+            futures = [service.submit(f"image-{i}") for i in range(3)]
+            for future in futures:
+                with pytest.raises(RuntimeError, match="推理失败"):
+                    future.result(timeout=5)
+        finally:
+            service.stop()